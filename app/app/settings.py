@@ -46,7 +46,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.profiling.RequestProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -110,6 +112,39 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing policy: argon2 (needs argon2-cffi), bcrypt (needs bcrypt)
+# or pbkdf2. The other hashers stay listed so existing hashes keep verifying
+# and are upgraded on the next login; only app.test_settings adds MD5.
+PASSWORD_HASHER_POLICY = os.environ.get('PASSWORD_HASHER_POLICY', 'pbkdf2')
+_PASSWORD_HASHERS = {
+    'argon2': 'core.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'core.hashers.TunedBCryptSHA256PasswordHasher',
+    'pbkdf2': 'core.hashers.TunedPBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER_POLICY]] + [
+    hasher for policy, hasher in _PASSWORD_HASHERS.items()
+    if policy != PASSWORD_HASHER_POLICY
+]
+
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 120000))
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 512))
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 2))
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+
+# Outdated hashes found at login are re-hashed on a small thread pool. Queued
+# jobs hold the plaintext password, so at most QUEUE_SIZE wait; upgrades
+# beyond that are dropped and happen on a later login.
+PASSWORD_REHASH_ASYNC = os.environ.get('PASSWORD_REHASH_ASYNC', '1') == '1'
+PASSWORD_REHASH_WORKERS = int(os.environ.get('PASSWORD_REHASH_WORKERS', 1))
+PASSWORD_REHASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_REHASH_QUEUE_SIZE', 32))
+
+# At most this many hashes are computed at once per process (0 = cpu count);
+# logins using more cpu than the budget are logged as warnings.
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', 0))
+PASSWORD_HASH_CPU_BUDGET_MS = int(os.environ.get('PASSWORD_HASH_CPU_BUDGET_MS', 250))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
 
@@ -132,3 +167,119 @@ MEDIA_URL ='/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 AUTH_USER_MODEL = "core.User"
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.RecipeCursorPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
+}
+
+RECIPE_BULK_CHUNK_SIZE = int(os.environ.get('RECIPE_BULK_CHUNK_SIZE', 500))
+
+# Cached list/retrieve responses of the recipe api. Leave the backend empty
+# to disable, use core.cache.LocalLRUCache for a single worker or
+# core.cache.SharedCache (OPTIONS: {'alias': ...}) when running several.
+RECIPE_RESPONSE_CACHE = {
+    'BACKEND': os.environ.get('RECIPE_RESPONSE_CACHE_BACKEND', ''),
+    'OPTIONS': {},
+    'TIMEOUT': int(os.environ.get('RECIPE_RESPONSE_CACHE_TIMEOUT', 300)),
+}
+
+# Seconds each delta sync window reaches back to catch late commits.
+RECIPE_SYNC_OVERLAP_SECONDS = int(os.environ.get('RECIPE_SYNC_OVERLAP_SECONDS', 5))
+# Rows of each kind returned per sync page, and days deletions are kept for
+# delta syncs; older tokens must start over. Prune with
+# manage.py prune_tombstones.
+RECIPE_SYNC_PAGE_SIZE = int(os.environ.get('RECIPE_SYNC_PAGE_SIZE', 500))
+RECIPE_SYNC_TOMBSTONE_DAYS = int(os.environ.get('RECIPE_SYNC_TOMBSTONE_DAYS', 30))
+
+# Cache of token -> user lookups; hits cost no query. Revoked tokens,
+# deactivations and password changes invalidate it at once in the worker that
+# made them. The per-process LRU keeps serving them in other workers for up to
+# TIMEOUT seconds, so the default is short; with several workers use
+# core.cache.SharedCache (OPTIONS: {'alias': ...}) on a cache they all share,
+# which every invalidation reaches.
+AUTH_TOKEN_CACHE = {
+    'BACKEND': os.environ.get('AUTH_TOKEN_CACHE_BACKEND', 'core.cache.LocalLRUCache'),
+    'OPTIONS': {'max_entries': 10000},
+    'TIMEOUT': int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 10)),
+}
+
+# Text search configuration used for the recipe search vector on postgres.
+RECIPE_SEARCH_CONFIG = os.environ.get('RECIPE_SEARCH_CONFIG', 'english')
+
+# Default number of matches returned by ?prefix= autocomplete lookups.
+RECIPE_AUTOCOMPLETE_LIMIT = int(os.environ.get('RECIPE_AUTOCOMPLETE_LIMIT', 10))
+
+# Uploaded recipe images are decoded, stripped of metadata and re-encoded by
+# a pool of background threads. Jobs beyond WORKERS + QUEUE_SIZE are run in
+# the request instead so memory stays bounded; recipes left pending by a
+# restart are picked up by manage.py process_recipe_images.
+RECIPE_IMAGE_ASYNC = os.environ.get('RECIPE_IMAGE_ASYNC', '1') == '1'
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_QUEUE_SIZE = int(os.environ.get('RECIPE_IMAGE_QUEUE_SIZE', 16))
+RECIPE_IMAGE_JPEG_QUALITY = int(os.environ.get('RECIPE_IMAGE_JPEG_QUALITY', 85))
+
+# Resized copies generated for every processed recipe image, stored under
+# renditions/ by content hash and created on first request when missing.
+RECIPE_IMAGE_RENDITION_WIDTHS = [
+    int(width) for width in
+    os.environ.get('RECIPE_IMAGE_RENDITION_WIDTHS', '200,600,1200').split(',')
+]
+RECIPE_IMAGE_RENDITION_FORMATS = os.environ.get(
+    'RECIPE_IMAGE_RENDITION_FORMATS', 'webp,jpg'
+).split(',')
+
+# Resumable chunked image uploads. Partial files live in TEMP_DIR (the system
+# temp directory when empty; use a shared volume with several containers)
+# and are dropped by manage.py collect_recipe_images after TTL_HOURS.
+RECIPE_UPLOAD_TEMP_DIR = os.environ.get('RECIPE_UPLOAD_TEMP_DIR', '')
+RECIPE_UPLOAD_MAX_BYTES = int(os.environ.get('RECIPE_UPLOAD_MAX_BYTES', 20 * 1024 * 1024))
+RECIPE_UPLOAD_CHUNK_MAX_BYTES = int(os.environ.get('RECIPE_UPLOAD_CHUNK_MAX_BYTES', 4 * 1024 * 1024))
+RECIPE_UPLOAD_TTL_HOURS = int(os.environ.get('RECIPE_UPLOAD_TTL_HOURS', 24))
+# Open upload sessions allowed per recipe before new ones are refused.
+RECIPE_UPLOAD_MAX_SESSIONS = int(os.environ.get('RECIPE_UPLOAD_MAX_SESSIONS', 5))
+
+# Limits checked from the image header before an upload is stored; larger
+# files are refused by RECIPE_UPLOAD_MAX_BYTES.
+RECIPE_IMAGE_FORMATS = os.environ.get('RECIPE_IMAGE_FORMATS', 'JPEG,PNG,WEBP').split(',')
+RECIPE_IMAGE_MAX_SIDE = int(os.environ.get('RECIPE_IMAGE_MAX_SIDE', 10000))
+RECIPE_IMAGE_MAX_PIXELS = int(os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40000000))
+
+# Recipes fetched per server-side cursor round trip by exports.
+RECIPE_EXPORT_CHUNK_SIZE = int(os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 1000))
+
+# Share of requests profiled by core.profiling.RequestProfilingMiddleware for
+# query count, SQL time, repeated statements and serializer time. Sampled
+# responses carry a Server-Timing header and log one json line.
+REQUEST_PROFILING_SAMPLE_RATE = float(
+    os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', '0.01')
+)
+
+# Metrics served at /metrics. With several worker processes point
+# MULTIPROCESS_DIR at a directory they share (emptied on deploy); each worker
+# writes its totals there every FLUSH_SECONDS and scrapes add them up. When
+# TOKEN is set scrapers must send it as a bearer token; without a token only
+# clients inside ALLOWED_NETWORKS (loopback by default) are served.
+METRICS_MULTIPROCESS_DIR = os.environ.get('METRICS_MULTIPROCESS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 1))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_NETWORKS = [
+    network for network in os.environ.get(
+        'METRICS_ALLOWED_NETWORKS', '127.0.0.0/8,::1/128'
+    ).split(',') if network
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_PROFILING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,12 @@
+"""settings for the test suite, used by manage.py test"""
+from app.settings import *  # noqa: F401,F403
+from app.settings import PASSWORD_HASHERS
+
+# unsalted and fast, never listed outside the test suite
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher'
+] + PASSWORD_HASHERS
+
+# run images through the pipeline inside the request so tests see the result
+RECIPE_IMAGE_ASYNC = False
+REQUEST_PROFILING_SAMPLE_RATE = 0
@@ -0,0 +1,242 @@
+import heapq
+import io
+import math
+import random
+import resource
+import time
+import tracemalloc
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from core.counters import recount
+from core.models import Ingredient, Recipe, Tag, User
+from core.search import update_search_index
+
+WORDS = (
+    'garlic', 'lemon', 'chicken', 'tofu', 'rice', 'noodle', 'basil', 'curry',
+    'tomato', 'onion', 'pepper', 'salmon', 'bean', 'mushroom', 'ginger',
+    'spinach', 'cheese', 'potato', 'carrot', 'honey', 'chili', 'coconut',
+    'lentil', 'pasta', 'bread', 'apple', 'almond', 'yogurt', 'pork', 'egg',
+)
+
+
+def zipf_weights(count, skew):
+    """popularity weights where rank r gets 1 / r ** skew"""
+    return [1 / (rank + 1) ** skew for rank in range(count)]
+
+
+def pick(rng, population, weights, count):
+    """count distinct items drawn by weight, without replacement
+
+    every item gets the shuffle key log(u) / weight and the largest keys win,
+    so a steep skew cannot stall the draw on already chosen items
+    """
+    def key(pair):
+        weight = pair[1]
+        if weight <= 0:
+            return -math.inf
+        return math.log(1 - rng.random()) / weight
+
+    return {
+        item for item, _ in heapq.nlargest(
+            count, zip(population, weights), key=key
+        )
+    }
+
+
+def seed_user(user, rng, tags, ingredients, recipes, tags_per_recipe,
+              ingredients_per_recipe, skew, batch_size):
+    """give a fresh user tags, ingredients and recipes linked by popularity"""
+    def names(count):
+        return [
+            f'{rng.choice(WORDS)} {rng.choice(WORDS)} {number}'
+            for number in range(count)
+        ]
+
+    Tag.objects.bulk_create(
+        [Tag(user=user, name=name) for name in names(tags)], batch_size
+    )
+    Ingredient.objects.bulk_create(
+        [Ingredient(user=user, name=name) for name in names(ingredients)],
+        batch_size
+    )
+    Recipe.objects.bulk_create([
+        Recipe(
+            user=user,
+            title=' '.join(rng.sample(WORDS, 3)),
+            time_minutes=rng.randint(5, 180),
+            price=round(rng.uniform(1, 99), 2),
+        )
+        for _ in range(recipes)
+    ], batch_size)
+
+    # the user is new, so every row it owns was created above
+    tag_ids, ingredient_ids, recipe_ids = (
+        list(model.objects.filter(user=user).order_by('id').values_list(
+            'id', flat=True
+        ))
+        for model in (Tag, Ingredient, Recipe)
+    )
+    for relation, ids, per_recipe in (
+            ('tags', tag_ids, tags_per_recipe),
+            ('ingredients', ingredient_ids, ingredients_per_recipe)):
+        if not ids:
+            continue
+        field = Recipe._meta.get_field(relation)
+        through = field.remote_field.through
+        weights = zipf_weights(len(ids), skew)
+        through.objects.bulk_create([
+            through(**{
+                field.m2m_column_name(): recipe_id,
+                field.m2m_reverse_name(): target,
+            })
+            for recipe_id in recipe_ids
+            for target in pick(rng, ids, weights, per_recipe)
+        ], batch_size)
+
+    recount(Tag, tag_ids)
+    recount(Ingredient, ingredient_ids)
+    recount(User, [user.pk])
+    update_search_index(recipe_ids)
+
+
+def seed(users, prefix, password, seed_value, batch_size, **sizes):
+    """create users named <prefix>-<n>@example.com with their catalogues
+
+    users that already exist are left alone, so reruns only top up
+    """
+    rng = random.Random(seed_value)
+    encoded = make_password(password)
+    created = 0
+    for number in range(users):
+        email = f'{prefix}-{number}@example.com'
+        user_rng = random.Random(rng.random())
+        if User.objects.filter(email=email).exists():
+            continue
+        with transaction.atomic():
+            user = User.objects.create(
+                email=email, name=email, password=encoded
+            )
+            seed_user(user, user_rng, batch_size=batch_size, **sizes)
+        created += 1
+    return created
+
+
+def percentile(values, pct):
+    """nearest rank percentile of an ascending list"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def jpeg_upload():
+    upload = io.BytesIO()
+    Image.new('RGB', (640, 480), 'orange').save(upload, format='JPEG')
+    upload.seek(0)
+    upload.name = 'bench.jpg'
+    return upload
+
+
+def scenarios(user, password):
+    """(name, method, url, data factory) driven by the benchmark"""
+    recipe = Recipe.objects.filter(user=user).order_by('id').first()
+    tag = Tag.objects.filter(user=user).order_by('-recipe_count').first()
+    items = [
+        ('recipes_list', 'get', reverse('recipe:recipe-list'), None),
+        ('tags_list', 'get', reverse('recipe:tag-list'), None),
+        ('tags_assigned', 'get',
+         reverse('recipe:tag-list') + '?assigned_only=1', None),
+        ('ingredients_list', 'get', reverse('recipe:ingredient-list'), None),
+        ('recipes_search', 'get',
+         reverse('recipe:recipe-list') + '?search=garlic', None),
+        ('token_create', 'post', reverse('user:token'),
+         lambda: {'email': user.email, 'password': password}),
+    ]
+    if tag is not None:
+        items.append((
+            'recipes_by_tag', 'get',
+            reverse('recipe:recipe-list') + f'?tags={tag.id}', None
+        ))
+    if recipe is not None:
+        items.append((
+            'recipe_detail', 'get',
+            reverse('recipe:recipe-detail', args=[recipe.id]), None
+        ))
+        items.append((
+            'upload_image', 'post',
+            reverse('recipe:recipe-upload-image', args=[recipe.id]),
+            lambda: {'image': jpeg_upload()}
+        ))
+    return items
+
+
+def _request(client, method, url, data, headers):
+    send = getattr(client, method)
+    response = send(url, data() if data else None, **headers)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def run(user, password, requests, warmup, only=None):
+    """time each scenario and return its latency, query and memory stats"""
+    client = Client()
+    token, _ = Token.objects.get_or_create(user=user)
+    headers = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+    results = {}
+    for name, method, url, data in scenarios(user, password):
+        if only and name not in only:
+            continue
+        for _ in range(warmup):
+            _request(client, method, url, data, headers)
+
+        timings, queries, statuses = [], [], {}
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = _request(client, method, url, data, headers)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+            code = str(response.status_code)
+            statuses[code] = statuses.get(code, 0) + 1
+
+        # memory is traced on a separate request so it does not skew timing
+        tracemalloc.start()
+        _request(client, method, url, data, headers)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        timings.sort()
+        results[name] = {
+            'requests': requests,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries_per_request': round(sum(queries) / len(queries), 2),
+            'peak_traced_kb': round(peak / 1024, 1),
+            'status_codes': statuses,
+        }
+    return {
+        'results': results,
+        # ru_maxrss is in KiB on linux
+        'peak_rss_mb': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def regressions(current, baseline, metric, tolerance):
+    """scenarios whose metric grew by more than tolerance percent"""
+    found = []
+    for name, stats in current['results'].items():
+        before = baseline.get('results', {}).get(name, {}).get(metric)
+        if before and stats[metric] > before * (1 + tolerance / 100):
+            found.append((name, before, stats[metric]))
+    return found
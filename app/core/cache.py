@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class LocalLRUCache:
+    """in-process least recently used cache, private to each worker"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def set(self, key, value, timeout=None):
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = (self._get(key) or 0) + 1
+            self._data[key] = (value, None)
+            self._data.move_to_end(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SharedCache:
+    """cache backed by a django cache alias shared between workers"""
+
+    def __init__(self, alias='default'):
+        self._cache = caches[alias]
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, timeout=None):
+        self._cache.set(key, value, timeout)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    def incr(self, key):
+        try:
+            return self._cache.incr(key)
+        except ValueError:
+            if self._cache.add(key, 1, None):
+                return 1
+            return self._cache.incr(key)
+
+    def clear(self):
+        self._cache.clear()
+
+
+_backends = {}
+
+
+def load_cache(name, config):
+    """return the backend described by a cache setting, or None if unset"""
+    path = config.get('BACKEND')
+    if not path:
+        return None
+    options = config.get('OPTIONS', {})
+    key = (name, path, tuple(sorted(options.items())))
+    if key not in _backends:
+        _backends[key] = import_string(path)(**options)
+    return _backends[key]
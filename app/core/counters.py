@@ -0,0 +1,50 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Ingredient, Recipe, Tag, User
+
+# model -> (table holding one row per counted recipe, column pointing back)
+COUNTED = {
+    User: (Recipe, 'user_id'),
+    Tag: (Recipe.tags.through, 'tag_id'),
+    Ingredient: (Recipe.ingredients.through, 'ingredient_id'),
+}
+
+
+def actual_count(model):
+    """expression counting the recipes of the outer row from scratch"""
+    table, column = COUNTED[model]
+    rows = table.objects.filter(**{column: OuterRef('pk')}).order_by()
+    return Coalesce(Subquery(
+        rows.values(column).annotate(count=Count('*')).values('count'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def adjust_counts(model, deltas):
+    """add deltas (pk -> change) to recipe_count, one UPDATE per distinct change"""
+    by_delta = defaultdict(list)
+    for pk, delta in Counter(deltas).items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(
+            recipe_count=F('recipe_count') + delta
+        )
+
+
+def recount(model, pks=None):
+    """recompute recipe_count of the given rows, or of all rows"""
+    queryset = model.objects.all()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=list(pks))
+    return queryset.update(recipe_count=actual_count(model))
+
+
+def drifted(model):
+    """rows whose stored recipe_count disagrees with the actual count"""
+    return model.objects.annotate(actual=actual_count(model)).exclude(
+        recipe_count=F('actual')
+    )
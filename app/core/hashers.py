@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+    make_password,
+)
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 with the iteration count taken from settings"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """argon2 with cost parameters taken from settings, needs argon2-cffi"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class TunedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    """bcrypt with the number of rounds taken from settings, needs bcrypt"""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
+
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_queue_slots = None
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_REHASH_WORKERS,
+                thread_name_prefix='password-rehash'
+            )
+        return _executor
+
+
+def _get_slots():
+    global _slots
+    with _lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(
+                settings.PASSWORD_HASH_CONCURRENCY or os.cpu_count() or 1
+            )
+        return _slots
+
+
+def _get_queue_slots():
+    global _queue_slots
+    with _lock:
+        if _queue_slots is None:
+            _queue_slots = threading.BoundedSemaphore(
+                settings.PASSWORD_REHASH_WORKERS
+                + settings.PASSWORD_REHASH_QUEUE_SIZE
+            )
+        return _queue_slots
+
+
+def upgrade_password_hash(user_id, old_encoded, raw_password):
+    """re-hash with the current hasher unless the password changed meanwhile"""
+    with password_hash_budget('rehash'):
+        encoded = make_password(raw_password)
+    return get_user_model().objects.filter(
+        pk=user_id, password=old_encoded
+    ).update(password=encoded)
+
+
+def _run_upgrade(user_id, old_encoded, raw_password):
+    try:
+        upgrade_password_hash(user_id, old_encoded, raw_password)
+    except Exception:
+        logger.exception('password re-hash failed for user %s', user_id)
+    finally:
+        _get_queue_slots().release()
+        connection.close()
+
+
+def schedule_password_upgrade(user_id, old_encoded, raw_password):
+    """upgrade an outdated hash off the request thread
+
+    returns False when the queue is full; the hash is upgraded on a later
+    login instead of keeping more plaintext passwords in memory
+    """
+    if not _get_queue_slots().acquire(blocking=False):
+        logger.info('password re-hash queue full, skipping user %s', user_id)
+        return False
+    _get_executor().submit(_run_upgrade, user_id, old_encoded, raw_password)
+    return True
+
+
+@contextmanager
+def password_hash_budget(label):
+    """limit concurrent hashing and log the cpu time it took"""
+    with _get_slots():
+        start = time.thread_time()
+        try:
+            yield
+        finally:
+            elapsed = (time.thread_time() - start) * 1000
+            budget = settings.PASSWORD_HASH_CPU_BUDGET_MS
+            if budget and elapsed > budget:
+                logger.warning(
+                    '%s password hashing used %.1fms cpu, budget is %dms',
+                    label, elapsed, budget
+                )
+            else:
+                logger.debug('%s password hashing used %.1fms cpu', label, elapsed)
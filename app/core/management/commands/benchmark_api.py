@@ -0,0 +1,83 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.benchmark import regressions, run
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the api through the test client"""
+    help = 'Report latency percentiles, queries and memory per api scenario'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email', default='bench-0@example.com',
+            help='user to run as, as created by seed_benchmark_data'
+        )
+        parser.add_argument('--password', default='benchpass')
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--scenario', action='append',
+            help='only run the named scenario, may be repeated'
+        )
+        parser.add_argument('--output', help='write the results as json')
+        parser.add_argument('--baseline', help='json results to compare with')
+        parser.add_argument(
+            '--metric', default='p95_ms',
+            choices=('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=10.0,
+            help='allowed growth of the metric over the baseline, in percent'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(
+                f"No user with email {options['email']}, "
+                'run seed_benchmark_data first'
+            )
+
+        # the test client sends Host: testserver; images are processed in
+        # the request so upload_image timings include the pipeline
+        with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                RECIPE_IMAGE_ASYNC=False):
+            report = run(
+                user, options['password'], options['requests'],
+                options['warmup'], options['scenario']
+            )
+        report['user'] = user.email
+        report['recipe_count'] = user.recipe_count
+
+        for name, stats in report['results'].items():
+            self.stdout.write(
+                f"{name:<18} p50 {stats['p50_ms']:>8.2f}ms "
+                f"p95 {stats['p95_ms']:>8.2f}ms p99 {stats['p99_ms']:>8.2f}ms "
+                f"{stats['queries_per_request']:>5} queries "
+                f"{stats['peak_traced_kb']:>8.1f}KB"
+            )
+        self.stdout.write(f"peak rss {report['peak_rss_mb']}MB")
+
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump(report, target, indent=2, sort_keys=True)
+
+        if options['baseline']:
+            with open(options['baseline']) as source:
+                baseline = json.load(source)
+            found = regressions(
+                report, baseline, options['metric'], options['tolerance']
+            )
+            if found:
+                raise CommandError('Regressions: ' + ', '.join(
+                    f'{name} {options["metric"]} {before} -> {after}'
+                    for name, before, after in found
+                ))
+            self.stdout.write(self.style.SUCCESS('No regressions'))
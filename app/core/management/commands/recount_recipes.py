@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.counters import COUNTED, drifted, recount
+
+
+class Command(BaseCommand):
+    """Django command to recompute the denormalized recipe counters"""
+    help = 'Recompute recipe_count on users, tags and ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='only report counters that drifted'
+        )
+
+    def handle(self, *args, **options):
+        for model in COUNTED:
+            name = model._meta.verbose_name_plural
+            stale = drifted(model).count()
+            if options['check']:
+                self.stdout.write(f'{name}: {stale} drifted')
+                continue
+            with transaction.atomic():
+                updated = recount(model)
+            self.stdout.write(
+                f'{name}: recounted {updated}, {stale} had drifted'
+            )
+        self.stdout.write(self.style.SUCCESS('Counters checked'))
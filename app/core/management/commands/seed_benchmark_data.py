@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.benchmark import seed
+
+
+class Command(BaseCommand):
+    """Django command to create a synthetic catalogue for benchmarks"""
+    help = 'Create users with tags, ingredients and recipes for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--tags', type=int, default=50, help='per user')
+        parser.add_argument('--ingredients', type=int, default=200, help='per user')
+        parser.add_argument('--recipes', type=int, default=1000, help='per user')
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='zipf exponent of tag and ingredient popularity, 0 for uniform'
+        )
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--password', default='benchpass')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        created = seed(
+            users=options['users'],
+            prefix=options['prefix'],
+            password=options['password'],
+            seed_value=options['seed'],
+            batch_size=options['batch_size'],
+            tags=options['tags'],
+            ingredients=options['ingredients'],
+            recipes=options['recipes'],
+            tags_per_recipe=options['tags_per_recipe'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            skew=options['skew'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {created} users in {time.monotonic() - start:.1f}s'
+        ))
@@ -0,0 +1,344 @@
+import fcntl
+import glob
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+# seconds, from a fast cached read to a slow upload
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+SIZE_BUCKETS = tuple(1024 * 4 ** power for power in range(1, 10))
+# url namespaces whose views get their own route label
+ROUTE_NAMESPACES = ('recipe', 'user')
+# request methods with their own label, anything else is 'other'
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+WORKER_FILE = re.compile(r'metrics-(\d+)-\d+\.json$')
+# totals of exited workers, folded together by fold_exited
+EXITED_FILE = 'exited.json'
+
+
+class Metric:
+    """a labelled counter or histogram kept in this process"""
+
+    def __init__(self, registry, name, help_text, kind, labels, buckets):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def _check(self, values):
+        if len(values) != len(self.labels):
+            raise ValueError(f'{self.name} takes labels {self.labels}')
+        return tuple(str(value) for value in values)
+
+    def inc(self, *labels, amount=1):
+        key = self._check(labels)
+        with self.registry.lock:
+            self.registry.reset_after_fork()
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, value, *labels):
+        """count value in its bucket; the last two slots hold sum and count"""
+        key = self._check(labels)
+        slot = len(self.buckets)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                slot = index
+                break
+        with self.registry.lock:
+            self.registry.reset_after_fork()
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(self.buckets) + 3)
+            counts[slot] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def snapshot(self):
+        return {
+            'kind': self.kind,
+            'help': self.help,
+            'labels': self.labels,
+            'buckets': self.buckets,
+            'values': [
+                [list(key), list(value) if self.buckets else value]
+                for key, value in self.values.items()
+            ],
+        }
+
+
+class Registry:
+    """metrics of this process, optionally shared through a directory
+
+    with METRICS_MULTIPROCESS_DIR set every worker writes its snapshot to
+    its own file at most every METRICS_FLUSH_SECONDS, and a scrape served
+    by any worker adds up the files of all of them. Files are named by pid
+    and start time so a new worker reusing a pid does not overwrite them;
+    scrapes fold the files of exited workers into one so counters neither go
+    backwards nor leave a file per restart behind.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metrics = {}
+        self.pid = os.getpid()
+        self.started = _start_time()
+        self.flushed = 0.0
+
+    def _register(self, name, help_text, kind, labels, buckets=()):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric(
+                    self, name, help_text, kind, labels, buckets
+                )
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(name, help_text, 'counter', labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(name, help_text, 'histogram', labels, buckets)
+
+    def reset_after_fork(self):
+        """drop values a forked worker inherited from its parent"""
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.started = _start_time()
+            self.flushed = 0.0
+            for metric in self.metrics.values():
+                metric.values = {}
+
+    def snapshot(self):
+        with self.lock:
+            self.reset_after_fork()
+            return {
+                name: metric.snapshot()
+                for name, metric in self.metrics.items()
+            }
+
+    def flush(self, force=False):
+        """write this process's snapshot to the shared directory"""
+        folder = settings.METRICS_MULTIPROCESS_DIR
+        now = time.monotonic()
+        if not folder or (
+                not force and now - self.flushed < settings.METRICS_FLUSH_SECONDS):
+            return
+        self.flushed = now
+        data = self.snapshot()
+        os.makedirs(folder, exist_ok=True)
+        _write(folder, f'metrics-{self.pid}-{self.started}.json', data)
+
+    def collect(self):
+        """snapshot merged over every worker sharing the directory"""
+        folder = settings.METRICS_MULTIPROCESS_DIR
+        if not folder:
+            return self.snapshot()
+        self.flush(force=True)
+        fold_exited(folder)
+        merged = {}
+        exited = _load(os.path.join(folder, EXITED_FILE)) or {}
+        for name, metric in exited.get('metrics', {}).items():
+            _merge(merged, name, metric)
+        for path in glob.glob(os.path.join(folder, 'metrics-*.json')):
+            for name, metric in (_load(path) or {}).items():
+                _merge(merged, name, metric)
+        return merged
+
+    def render(self):
+        """the metrics in the prometheus text exposition format"""
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f'# HELP {name} {metric["help"]}')
+            lines.append(f'# TYPE {name} {metric["kind"]}')
+            for key, value in sorted(metric['values']):
+                labels = list(zip(metric['labels'], key))
+                if metric['kind'] == 'counter':
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                    continue
+                total = 0
+                for bound, count in zip(
+                        list(metric['buckets']) + [math.inf], value):
+                    total += count
+                    bucket = labels + [('le', _number(bound))]
+                    lines.append(f'{name}_bucket{_labels(bucket)} {total}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(value[-2])}')
+                lines.append(f'{name}_count{_labels(labels)} {value[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _start_time():
+    return int(time.time() * 1000)
+
+
+def _load(path):
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _write(folder, name, data):
+    handle, temp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    with os.fdopen(handle, 'w') as target:
+        target.write(json.dumps(data))
+    os.replace(temp, os.path.join(folder, name))
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def fold_exited(folder):
+    """merge the files of workers that are gone into the exited totals
+
+    the exited file lists the files it already holds, so a crash between
+    writing it and removing them cannot count them twice
+    """
+    with open(os.path.join(folder, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        exited = _load(os.path.join(folder, EXITED_FILE)) or {}
+        for name in exited.get('folded', []):
+            _unlink(os.path.join(folder, name))
+        dead = []
+        for path in glob.glob(os.path.join(folder, 'metrics-*.json')):
+            match = WORKER_FILE.search(path)
+            if match and not _alive(int(match.group(1))):
+                dead.append(path)
+        if not dead:
+            return
+        merged = exited.get('metrics', {})
+        for path in dead:
+            for name, metric in (_load(path) or {}).items():
+                _merge(merged, name, metric)
+        _write(folder, EXITED_FILE, {
+            'metrics': merged,
+            'folded': [os.path.basename(path) for path in dead],
+        })
+        for path in dead:
+            _unlink(path)
+
+
+def _merge(merged, name, metric):
+    target = merged.setdefault(name, dict(metric, values=[]))
+    values = {tuple(key): value for key, value in target['values']}
+    for key, value in metric['values']:
+        key = tuple(key)
+        if key not in values:
+            values[key] = value
+        elif isinstance(value, list):
+            values[key] = [a + b for a, b in zip(values[key], value)]
+        else:
+            values[key] += value
+    target['values'] = [[list(key), value] for key, value in values.items()]
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+registry = Registry()
+counter = registry.counter
+histogram = registry.histogram
+
+REQUEST_SECONDS = histogram(
+    'http_request_duration_seconds', 'Time to build the response.',
+    ('route', 'method')
+)
+REQUESTS = counter(
+    'http_requests_total', 'Responses by status code.',
+    ('route', 'method', 'status')
+)
+DB_QUERIES = counter(
+    'db_queries_total', 'Database statements run by requests.', ('route',)
+)
+DB_SECONDS = counter(
+    'db_query_seconds_total', 'Time requests spent in the database.', ('route',)
+)
+
+
+def route_of(request):
+    """view name of requests to the api, a fixed label for anything else"""
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched'
+    if match.namespace in ROUTE_NAMESPACES:
+        return match.view_name
+    return 'other'
+
+
+class _QueryTimer:
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    """record latency, status and database use of every request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        route = route_of(request)
+        method = request.method if request.method in METHODS else 'other'
+        REQUEST_SECONDS.observe(elapsed, route, method)
+        REQUESTS.inc(route, method, response.status_code)
+        DB_QUERIES.inc(route, amount=timer.queries)
+        DB_SECONDS.inc(route, amount=timer.seconds)
+        registry.flush()
+        return response
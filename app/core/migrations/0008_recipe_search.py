@@ -0,0 +1,86 @@
+# Generated by Django 2.1.15 on 2026-10-18 16:54
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+BACKFILL_VECTOR_SQL = """
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector(%(config)s::regconfig, core_recipe.title), 'A') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(core_tag.name, ' ') FROM core_tag
+        INNER JOIN core_recipe_tags ON core_recipe_tags.tag_id = core_tag.id
+        WHERE core_recipe_tags.recipe_id = core_recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(core_ingredient.name, ' ') FROM core_ingredient
+        INNER JOIN core_recipe_ingredients
+            ON core_recipe_ingredients.ingredient_id = core_ingredient.id
+        WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+    ), '')), 'B')
+"""
+
+
+def build_search_index(apps, schema_editor):
+    """add the GIN index on postgres, fill the term table elsewhere"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX core_recipe_search_gin '
+            'ON core_recipe USING gin (search_vector)'
+        )
+        # the same configuration queries and core.search updates use
+        schema_editor.execute(
+            BACKFILL_VECTOR_SQL, {'config': settings.RECIPE_SEARCH_CONFIG}
+        )
+        return
+
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeSearchTerm = apps.get_model('core', 'RecipeSearchTerm')
+    rows = []
+    for recipe in Recipe.objects.prefetch_related('tags', 'ingredients'):
+        weights = dict.fromkeys(re.findall(r'\w+', recipe.title.lower()), 1.0)
+        for obj in list(recipe.tags.all()) + list(recipe.ingredients.all()):
+            for term in re.findall(r'\w+', obj.name.lower()):
+                weights.setdefault(term, 0.4)
+        rows.extend(
+            RecipeSearchTerm(recipe_id=recipe.id, term=term, weight=weight)
+            for term, weight in weights.items()
+        )
+    RecipeSearchTerm.objects.bulk_create(rows, batch_size=1000)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_recipe_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, max_length=255)),
+                ('weight', models.FloatField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipesearchterm',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='core.Recipe'),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
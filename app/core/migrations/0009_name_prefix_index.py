@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_prefix_indexes(apps, schema_editor):
+    """index UPPER(name) so istartswith lookups become index range scans"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in ('core_tag', 'core_ingredient'):
+        schema_editor.execute(
+            f'CREATE INDEX {table}_name_prefix ON {table} '
+            f'(user_id, UPPER(name) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in ('core_tag', 'core_ingredient'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_name_prefix')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.1.15 on 2026-10-18 17:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    counted = (
+        (apps.get_model('core', 'User'), Recipe, 'user_id'),
+        (apps.get_model('core', 'Tag'), Recipe.tags.through, 'tag_id'),
+        (
+            apps.get_model('core', 'Ingredient'),
+            Recipe.ingredients.through,
+            'ingredient_id',
+        ),
+    )
+    for model, table, column in counted:
+        rows = table.objects.filter(**{column: OuterRef('pk')}).order_by()
+        model.objects.update(recipe_count=Coalesce(Subquery(
+            rows.values(column).annotate(count=Count('*')).values('count'),
+            output_field=IntegerField()
+        ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_range_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.1.15 on 2026-10-18 19:20
+
+import hashlib
+
+from django.db import migrations
+
+
+def backfill_image_hash(apps, schema_editor):
+    """hash images marked ready by 0013 so renditions can be made for them"""
+    Recipe = apps.get_model('core', 'Recipe')
+    legacy = Recipe.objects.filter(image_status='ready', image_hash='').exclude(
+        image=''
+    ).only('id', 'image')
+    for recipe in legacy.iterator():
+        digest = hashlib.sha256()
+        try:
+            with recipe.image.storage.open(recipe.image.name) as source:
+                for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except OSError:
+            # the file is gone, there is nothing to render
+            continue
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image_hash=digest.hexdigest()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_imageupload'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_image_hash, migrations.RunPython.noop),
+    ]
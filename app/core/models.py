@@ -1,8 +1,11 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import AbstractBaseUser,BaseUserManager,PermissionsMixin
 from django.conf import settings
 import uuid
 import os
+from core.hashers import password_hash_budget,schedule_password_upgrade
 
 def recipe_image_file_path(instance,filename):
     """generate filepath for new image"""
@@ -10,13 +13,21 @@ def recipe_image_file_path(instance,filename):
     filename = f'{uuid.uuid4()}.{ext}'
     return os.path.join('uploads/recipe/',filename)
 
+def recipe_image_content_path(content_hash,ext):
+    """path of a processed image, sharded by its content hash"""
+    return os.path.join(
+        'uploads/recipe/', content_hash[:2], content_hash[2:4],
+        f'{content_hash}.{ext}'
+    )
+
 class UserManager(BaseUserManager):
     def create_user(self,email,password=None, **extra_fields):
         """Create user and saves it """
         if not email:
             raise ValueError('All users must have an email adress!')
         user = self.model(email =self.normalize_email(email) ,**extra_fields)
-        user.set_password(password)
+        with password_hash_budget('signup'):
+            user.set_password(password)
         user.save(using=self._db)
         return user
 
@@ -35,27 +46,61 @@ class UserManager(BaseUserManager):
 
 
 
-class User(AbstractBaseUser,PermissionsMixin):
+class RecipeCountMixin:
+    """keep recipe_count out of ordinary saves
+
+    the counter only changes through F() updates in core.counters, so saving
+    a copy loaded earlier must not write its stale value back
+    """
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'recipe_count'
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(RecipeCountMixin,AbstractBaseUser,PermissionsMixin):
     """Custom user Model"""
     email = models.EmailField(max_length=255, unique=True)
     name =models.CharField(max_length=255)
     is_active=models.BooleanField(default=True)
     is_staff = models.BooleanField(default=True)
+    recipe_count = models.IntegerField(default=0, editable=False)
 
     objects =  UserManager()
 
 
     USERNAME_FIELD = "email"
 
+    def check_password(self, raw_password):
+        """check password and upgrade an outdated hash in the background"""
+        if not settings.PASSWORD_REHASH_ASYNC:
+            return super().check_password(raw_password)
+
+        encoded = self.password
+
+        def setter(raw_password):
+            schedule_password_upgrade(self.pk, encoded, raw_password)
+        return check_password(raw_password, encoded, setter)
 
 
-class Tag(models.Model):
+
+class Tag(RecipeCountMixin,models.Model):
     """Tag to be used for a recipe"""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
     settings.AUTH_USER_MODEL,
     on_delete = models.CASCADE
     )
+    recipe_count = models.IntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'updated_at'])]
 
 
     def __str__(self):
@@ -63,13 +108,18 @@ class Tag(models.Model):
 
 
 
-class Ingredient(models.Model):
+class Ingredient(RecipeCountMixin,models.Model):
     """Ingredient to be used in a recipe"""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
     settings.AUTH_USER_MODEL,
     on_delete=models.CASCADE
     )
+    recipe_count = models.IntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'updated_at'])]
 
     def __str__(self):
         return self.name
@@ -83,6 +133,86 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True,upload_to=recipe_image_file_path)
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+    image_status = models.CharField(
+        max_length=10, choices=IMAGE_STATUS_CHOICES, blank=True, default=''
+    )
+    image_hash = models.CharField(
+        max_length=64, blank=True, default='', editable=False, db_index=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', 'time_minutes']),
+            models.Index(fields=['user', 'price']),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeSearchTerm(models.Model):
+    """inverted index entry used for recipe search outside postgres"""
+    recipe = models.ForeignKey(
+    'Recipe',
+    on_delete=models.CASCADE,
+    related_name='search_terms'
+    )
+    term = models.CharField(max_length=255, db_index=True)
+    weight = models.FloatField()
+
+
+class Tombstone(models.Model):
+    """record of a deleted recipe, tag or ingredient for delta sync"""
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    KIND_CHOICES = (
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    )
+
+    user = models.ForeignKey(
+    settings.AUTH_USER_MODEL,
+    on_delete=models.CASCADE,
+    db_constraint=False
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'deleted_at'])]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+
+class ImageUpload(models.Model):
+    """resumable upload of a recipe image received in chunks"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipe = models.ForeignKey(
+    'Recipe',
+    on_delete=models.CASCADE,
+    related_name='image_uploads'
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveIntegerField()
+    received = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.filename} {self.received}/{self.size}'
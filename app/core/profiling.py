@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_SPACE = re.compile(r'\s+')
+
+
+class RequestProfile:
+    """database and serializer time spent by one request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        """django execute wrapper counting and timing every statement"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        """[(fingerprint, count, sql)] of statements run more than once
+
+        parameters are already placeholders, so only IN lists of varying
+        length need folding before statements compare equal
+        """
+        counts = Counter()
+        for sql, count in self.statements.items():
+            counts[_SPACE.sub(' ', _IN_LIST.sub('IN (...)', sql))] += count
+        return [
+            (hashlib.sha1(sql.encode()).hexdigest()[:12], count, sql)
+            for sql, count in counts.most_common() if count > 1
+        ]
+
+
+def current_profile():
+    """profile of the request being handled by this thread, if sampled"""
+    return getattr(_local, 'profile', None)
+
+
+def _timed(prop):
+    def data(self):
+        profile = current_profile()
+        if profile is None:
+            return prop.fget(self)
+        start = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            profile.serializer_seconds += time.perf_counter() - start
+    data.timed = True
+    return property(data)
+
+
+def install_serializer_timing():
+    """time serializer.data, where drf builds the representation
+
+    nested serializers only call to_representation, so time is not counted
+    twice; unsampled requests pay one thread-local lookup
+    """
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, 'timed', False):
+            cls.data = _timed(cls.data)
+
+
+class RequestProfilingMiddleware:
+    """profile a sample of requests for queries and serializer time
+
+    sampled responses get a Server-Timing header and one json log line on
+    the core.profiling logger. Queries run while a streaming response is
+    iterated are not included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_serializer_timing()
+
+    def __call__(self, request):
+        rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        _local.profile = profile
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(profile)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        total = time.perf_counter() - start
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={profile.sql_seconds * 1000:.2f};'
+            f'desc="{profile.queries} queries"',
+            f'serializer;dur={profile.serializer_seconds * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+        match = request.resolver_match
+        duplicates = profile.duplicates()
+        logger.info(json.dumps({
+            'event': 'request_profile',
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 2),
+            'queries': profile.queries,
+            'sql_ms': round(profile.sql_seconds * 1000, 2),
+            'serializer_ms': round(profile.serializer_seconds * 1000, 2),
+            'duplicates': [
+                {'fingerprint': fingerprint, 'count': count, 'sql': sql[:200]}
+                for fingerprint, count, sql in duplicates
+            ],
+        }, sort_keys=True))
+        return response
@@ -0,0 +1,126 @@
+import re
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, transaction
+from django.db.models import (
+    Count, F, FloatField, IntegerField, OuterRef, Prefetch, Subquery, Sum
+)
+
+from core.models import Ingredient, Recipe, RecipeSearchTerm, Tag
+
+TITLE_WEIGHT = 1.0
+RELATED_WEIGHT = 0.4
+
+TERM_RE = re.compile(r'\w+')
+
+UPDATE_VECTOR_SQL = """
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector(%(config)s::regconfig, core_recipe.title), 'A') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(core_tag.name, ' ') FROM core_tag
+        INNER JOIN core_recipe_tags ON core_recipe_tags.tag_id = core_tag.id
+        WHERE core_recipe_tags.recipe_id = core_recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(core_ingredient.name, ' ') FROM core_ingredient
+        INNER JOIN core_recipe_ingredients
+            ON core_recipe_ingredients.ingredient_id = core_ingredient.id
+        WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+    ), '')), 'B')
+WHERE core_recipe.id = ANY(%(ids)s)
+"""
+
+
+def uses_search_vector():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(text):
+    """split text into lower case search terms"""
+    return list(dict.fromkeys(TERM_RE.findall(text.lower())))
+
+
+def schedule_search_update(recipe_ids):
+    """refresh the search data of recipes once the transaction commits
+
+    every save and relation change of a transaction adds to one pending set,
+    so a recipe written several times is refreshed once; outside a
+    transaction the refresh runs at once
+    """
+    ids = set(recipe_ids)
+    if not ids:
+        return
+    if not connection.in_atomic_block:
+        update_search_index(ids)
+        return
+    pending = getattr(connection, '_pending_search_update', None)
+    # a rollback drops the callback, leaving the old set behind
+    if pending is None or not any(
+            func is pending[0] for _, func in connection.run_on_commit):
+        def flush():
+            queued = connection._pending_search_update[1]
+            del connection._pending_search_update
+            update_search_index(queued)
+
+        pending = connection._pending_search_update = (flush, set())
+        transaction.on_commit(flush)
+    pending[1].update(ids)
+
+
+def update_search_index(recipe_ids):
+    """recompute the search data of the given recipes"""
+    ids = list(recipe_ids)
+    if not ids:
+        return
+    if uses_search_vector():
+        with connection.cursor() as cursor:
+            cursor.execute(UPDATE_VECTOR_SQL, {
+                'config': settings.RECIPE_SEARCH_CONFIG,
+                'ids': ids,
+            })
+        return
+
+    RecipeSearchTerm.objects.filter(recipe_id__in=ids).delete()
+    recipes = Recipe.objects.filter(id__in=ids).only('id', 'title').prefetch_related(
+        Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+        Prefetch('ingredients', queryset=Ingredient.objects.only('id', 'name')),
+    )
+    rows = []
+    for recipe in recipes:
+        weights = dict.fromkeys(tokenize(recipe.title), TITLE_WEIGHT)
+        for obj in chain(recipe.tags.all(), recipe.ingredients.all()):
+            for term in tokenize(obj.name):
+                weights.setdefault(term, RELATED_WEIGHT)
+        rows.extend(
+            RecipeSearchTerm(recipe_id=recipe.id, term=term, weight=weight)
+            for term, weight in weights.items()
+        )
+    RecipeSearchTerm.objects.bulk_create(rows)
+
+
+def search_recipes(queryset, text):
+    """filter queryset to recipes matching every term, best match first"""
+    if uses_search_vector():
+        query = SearchQuery(text, config=settings.RECIPE_SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-id')
+
+    terms = tokenize(text)
+    if not terms:
+        return queryset.none()
+    matches = RecipeSearchTerm.objects.filter(
+        recipe=OuterRef('pk'), term__in=terms
+    ).order_by().values('recipe')
+    return queryset.annotate(
+        rank=Subquery(
+            matches.annotate(rank=Sum('weight')).values('rank'),
+            output_field=FloatField()
+        ),
+        hits=Subquery(
+            matches.annotate(hits=Count('term', distinct=True)).values('hits'),
+            output_field=IntegerField()
+        ),
+    ).filter(hits=len(terms)).order_by('-rank', '-id')
@@ -0,0 +1,151 @@
+from collections import Counter
+
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.counters import adjust_counts
+from core.models import Ingredient, Recipe, Tag, Tombstone, User
+from core.search import schedule_search_update
+
+
+def recipe_ids(**filters):
+    return list(Recipe.objects.filter(**filters).values_list('id', flat=True))
+
+
+def refresh_recipes(ids):
+    """bump updated_at and the search data of recipes whose output changed"""
+    ids = list(ids)
+    if not ids:
+        return
+    Recipe.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+    schedule_search_update(ids)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields, **kwargs):
+    """only the title of the recipe row is part of its search data"""
+    if update_fields is not None and 'title' not in update_fields:
+        return
+    schedule_search_update([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """refresh recipes when their tag or ingredient sets change"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_recipes([instance.pk])
+        return
+
+    relation = 'tags' if sender is Recipe.tags.through else 'ingredients'
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = recipe_ids(**{relation: instance})
+    elif action == 'post_clear':
+        refresh_recipes(instance.__dict__.pop('_cleared_recipe_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        refresh_recipes(pk_set or [])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    """recipes embed tag and ingredient names, so renames refresh them"""
+    if not created:
+        relation = 'tags' if sender is Tag else 'ingredients'
+        refresh_recipes(recipe_ids(**{relation: instance}))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    relation = 'tags' if sender is Tag else 'ingredients'
+    instance._linked_recipe_ids = recipe_ids(**{relation: instance})
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    refresh_recipes(instance.__dict__.pop('_linked_recipe_ids', []))
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def record_tombstone(sender, instance, **kwargs):
+    """remember deletions so sync clients can drop their copies"""
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        kind=sender._meta.model_name,
+        object_id=instance.pk,
+    )
+
+
+@receiver(post_delete, sender=User)
+def drop_tombstones(sender, instance, **kwargs):
+    """remove tombstones written while the user's rows were cascaded"""
+    Tombstone.objects.filter(user_id=instance.pk).delete()
+
+
+def _linked_counts(sender, instance, reverse, pk_set):
+    """count through rows touched by an m2m change, keyed by tag/ingredient"""
+    field = sender._meta.get_field(
+        'tag' if sender is Recipe.tags.through else 'ingredient'
+    )
+    recipe_column = 'recipe_id'
+    target_column = field.attname
+    filters = {target_column if reverse else recipe_column: instance.pk}
+    if pk_set is not None:
+        filters[f'{recipe_column if reverse else target_column}__in'] = pk_set
+    return Counter(
+        sender.objects.filter(**filters).values_list(target_column, flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_relations_changed(sender, instance, action, reverse, model, pk_set,
+                            **kwargs):
+    """keep recipe_count of tags and ingredients in step with the links"""
+    target = Tag if sender is Recipe.tags.through else Ingredient
+    if action == 'post_add' and pk_set:
+        if reverse:
+            adjust_counts(target, {instance.pk: len(pk_set)})
+        else:
+            adjust_counts(target, dict.fromkeys(pk_set, 1))
+    elif action in ('pre_remove', 'pre_clear'):
+        ids = pk_set if action == 'pre_remove' else None
+        instance.__dict__.setdefault('_unlinked_counts', {})[sender] = (
+            _linked_counts(sender, instance, reverse, ids)
+        )
+    elif action in ('post_remove', 'post_clear'):
+        counts = instance.__dict__.get('_unlinked_counts', {}).pop(sender, {})
+        adjust_counts(target, {pk: -count for pk, count in counts.items()})
+
+
+@receiver(post_save, sender=Recipe)
+def count_recipe_created(sender, instance, created, **kwargs):
+    if created:
+        adjust_counts(User, {instance.user_id: 1})
+
+
+@receiver(pre_delete, sender=Recipe)
+def count_recipe_deleting(sender, instance, **kwargs):
+    instance._unlinked_counts = {
+        through: _linked_counts(through, instance, False, None)
+        for through in (Recipe.tags.through, Recipe.ingredients.through)
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def count_recipe_deleted(sender, instance, **kwargs):
+    adjust_counts(User, {instance.user_id: -1})
+    counts = instance.__dict__.pop('_unlinked_counts', {})
+    for through, target in ((Recipe.tags.through, Tag),
+                            (Recipe.ingredients.through, Ingredient)):
+        linked = counts.get(through, {})
+        adjust_counts(target, {pk: -count for pk, count in linked.items()})
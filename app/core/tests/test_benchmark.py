@@ -0,0 +1,78 @@
+import io
+import json
+import os
+import random
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.benchmark import pick, zipf_weights
+from core.counters import drifted
+from core.models import Ingredient, Recipe, Tag, User
+from recipe.test.helpers import use_temp_media
+
+
+class BenchmarkCommandTests(TestCase):
+    """test seeding data and benchmarking the api"""
+
+    def seed(self, *args):
+        call_command(
+            'seed_benchmark_data', '--users', '2', '--recipes', '5',
+            '--tags', '4', '--ingredients', '6', *args, stdout=io.StringIO()
+        )
+
+    def test_seed_benchmark_data(self):
+        """test seeded rows, fan-out and counters are consistent"""
+        self.seed('--tags-per-recipe', '2')
+        self.seed('--tags-per-recipe', '2')
+
+        user = User.objects.get(email='bench-0@example.com')
+        self.assertTrue(user.check_password('benchpass'))
+        self.assertEqual(User.objects.filter(email__startswith='bench-').count(), 2)
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 5)
+        for recipe in Recipe.objects.filter(user=user):
+            self.assertEqual(recipe.tags.count(), 2)
+        for model in (User, Tag, Ingredient):
+            self.assertFalse(drifted(model).exists())
+
+    def test_pick_with_steep_skew(self):
+        """test a steep skew still yields the requested number of items"""
+        population = list(range(50))
+
+        chosen = pick(random.Random(1), population, zipf_weights(50, 8), 20)
+
+        self.assertEqual(len(chosen), 20)
+        self.assertIn(0, chosen)
+        self.assertLessEqual(chosen, set(population))
+
+    def test_benchmark_api_writes_and_compares(self):
+        """test results are written and regressions fail the run"""
+        use_temp_media(self)
+        self.seed()
+        output = os.path.join(tempfile.mkdtemp(), 'run.json')
+        call_command(
+            'benchmark_api', '--requests', '3', '--warmup', '0',
+            '--output', output, stdout=io.StringIO()
+        )
+        with open(output) as source:
+            report = json.load(source)
+        for name in ('recipes_list', 'tags_list', 'token_create', 'upload_image'):
+            stats = report['results'][name]
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+            self.assertGreater(stats['queries_per_request'], 0)
+        self.assertEqual(report['results']['upload_image']['status_codes'], {'200': 3})
+        self.assertEqual(report['results']['token_create']['status_codes'], {'200': 3})
+
+        baseline = os.path.join(tempfile.mkdtemp(), 'base.json')
+        for stats in report['results'].values():
+            stats['queries_per_request'] /= 2
+        with open(baseline, 'w') as target:
+            json.dump(report, target)
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark_api', '--requests', '2', '--warmup', '0',
+                '--scenario', 'recipes_list', '--baseline', baseline,
+                '--metric', 'queries_per_request', stdout=io.StringIO()
+            )
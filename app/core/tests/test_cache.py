@@ -0,0 +1,23 @@
+from django.test import TestCase
+from core.cache import LocalLRUCache
+
+
+class LocalLRUCacheTest(TestCase):
+
+    def test_evicts_least_recently_used(self):
+        """test the oldest untouched entry is dropped first"""
+        cache = LocalLRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_incr(self):
+        """test incrementing a missing and an existing key"""
+        cache = LocalLRUCache()
+        self.assertEqual(cache.incr('gen'), 1)
+        self.assertEqual(cache.incr('gen'), 2)
@@ -0,0 +1,87 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Ingredient, Recipe, Tag
+
+
+class CounterTests(TestCase):
+    """test recipe_count stays in step with recipes and their links"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'count@count.com', 'testpass'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+
+    def recipe(self):
+        return Recipe.objects.create(
+            user=self.user, title='Salad', time_minutes=5, price=5
+        )
+
+    def test_save_keeps_counter(self):
+        """test saving a copy loaded before recipes were linked keeps counts"""
+        recipe = self.recipe()
+        recipe.tags.add(self.tag)
+        recipe.ingredients.add(self.ingredient)
+
+        # self.user, self.tag and self.ingredient still hold recipe_count 0
+        for obj in (self.user, self.tag, self.ingredient):
+            obj.name = 'renamed'
+            obj.save()
+
+        self.assertEqual(self.counts(), (1, 1, 1))
+
+    def counts(self):
+        for obj in (self.user, self.tag, self.ingredient):
+            obj.refresh_from_db()
+        return (
+            self.user.recipe_count,
+            self.tag.recipe_count,
+            self.ingredient.recipe_count,
+        )
+
+    def test_counts_follow_links(self):
+        """test adding, removing and clearing links moves the counters"""
+        first, second = self.recipe(), self.recipe()
+        first.tags.add(self.tag)
+        first.tags.add(self.tag)
+        second.tags.add(self.tag)
+        first.ingredients.add(self.ingredient)
+        self.assertEqual(self.counts(), (2, 2, 1))
+
+        first.tags.remove(self.tag)
+        second.tags.remove(self.tag)
+        self.ingredient.recipe_set.clear()
+        self.assertEqual(self.counts(), (2, 0, 0))
+
+    def test_reverse_links_counted(self):
+        """test changing links from the tag side moves its counter"""
+        recipes = [self.recipe() for _ in range(3)]
+        self.tag.recipe_set.add(*recipes)
+        self.tag.recipe_set.remove(recipes[0])
+
+        self.assertEqual(self.counts(), (3, 2, 0))
+
+    def test_delete_recipe_decrements(self):
+        """test deleting a recipe releases its user and links"""
+        recipe = self.recipe()
+        recipe.tags.add(self.tag)
+        recipe.ingredients.add(self.ingredient)
+        recipe.delete()
+
+        self.assertEqual(self.counts(), (0, 0, 0))
+
+    def test_recount_command_fixes_drift(self):
+        """test the recount command restores the actual counts"""
+        recipe = self.recipe()
+        recipe.tags.add(self.tag)
+        Tag.objects.update(recipe_count=7)
+        get_user_model().objects.update(recipe_count=0)
+
+        call_command('recount_recipes', stdout=StringIO())
+
+        self.assertEqual(self.counts(), (1, 1, 0))
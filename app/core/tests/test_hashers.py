@@ -0,0 +1,85 @@
+import threading
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from app import settings as app_settings
+from core import hashers
+
+
+PBKDF2_HASHERS = [
+    'core.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+
+@override_settings(PASSWORD_HASHERS=PBKDF2_HASHERS)
+class HasherPolicyTest(TestCase):
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_iterations_from_settings(self):
+        """test the pbkdf2 work factor comes from settings"""
+        encoded = make_password('secret')
+
+        self.assertEqual(encoded.split('$')[1], '1000')
+
+    @patch('core.models.schedule_password_upgrade')
+    def test_outdated_hash_upgraded_in_background(self, schedule):
+        """test login with an old hash schedules a re-hash instead of saving"""
+        user = get_user_model().objects.create_user('hash@hash.com','')
+        user.password = make_password('secret', hasher='md5')
+        user.save()
+
+        self.assertTrue(user.check_password('secret'))
+
+        schedule.assert_called_once_with(user.pk, user.password, 'secret')
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, 'md5')
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_upgrade_password_hash(self):
+        """test the background upgrade rewrites the hash"""
+        user = get_user_model().objects.create_user('hash@hash.com','')
+        old = make_password('secret', hasher='md5')
+        get_user_model().objects.filter(pk=user.pk).update(password=old)
+
+        hashers.upgrade_password_hash(user.pk, old, 'secret')
+
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, 'pbkdf2_sha256')
+        self.assertTrue(user.check_password('secret'))
+
+    def test_upgrade_skipped_after_password_change(self):
+        """test a stale upgrade never overwrites a newer password"""
+        user = get_user_model().objects.create_user('hash@hash.com','')
+        old = make_password('secret', hasher='md5')
+        user.set_password('changed')
+        user.save()
+
+        updated = hashers.upgrade_password_hash(user.pk, old, 'secret')
+
+        self.assertEqual(updated, 0)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('changed'))
+
+    @override_settings(PASSWORD_HASH_CPU_BUDGET_MS=1)
+    def test_budget_overrun_logged(self):
+        """test hashing slower than the budget is logged"""
+        with self.assertLogs('core.hashers', level='WARNING'):
+            with hashers.password_hash_budget('login'):
+                sum(i * i for i in range(300000))
+
+    def test_full_rehash_queue_skips_upgrade(self):
+        """test no more plaintext passwords are queued than allowed"""
+        with patch.object(hashers, '_queue_slots', threading.Semaphore(0)), \
+                patch.object(hashers, '_get_executor') as executor:
+            queued = hashers.schedule_password_upgrade(1, 'old', 'secret')
+
+        self.assertFalse(queued)
+        executor.assert_not_called()
+
+    def test_production_hashers_exclude_md5(self):
+        """test unsalted md5 hashes never verify outside the test suite"""
+        self.assertFalse(any(
+            'MD5' in hasher for hasher in app_settings.PASSWORD_HASHERS
+        ))
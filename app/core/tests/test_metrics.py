@@ -0,0 +1,142 @@
+import glob
+import json
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.metrics import REQUESTS, Registry, registry
+
+
+METRICS_URL = reverse('metrics')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RegistryTests(TestCase):
+    """test rendering and merging of metrics"""
+
+    def test_histogram_rendering(self):
+        """test buckets are cumulative and labels escaped"""
+        metrics = Registry()
+        latency = metrics.histogram(
+            'latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1)
+        )
+        latency.observe(0.05, 'a"b')
+        latency.observe(5, 'a"b')
+
+        text = metrics.render()
+
+        self.assertIn('latency_seconds_bucket{route="a\\"b",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="a\\"b",le="1.0"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="a\\"b",le="+Inf"} 2', text)
+        self.assertIn('latency_seconds_count{route="a\\"b"} 2', text)
+
+    def test_workers_added_up(self):
+        """test a scrape sums the files written by every worker"""
+        folder = tempfile.mkdtemp()
+        other = Registry()
+        other.counter('jobs_total', 'Jobs.', ('kind',)).inc('x', amount=2)
+        with open(os.path.join(folder, 'metrics-1.json'), 'w') as target:
+            json.dump(other.snapshot(), target)
+        metrics = Registry()
+        metrics.counter('jobs_total', 'Jobs.', ('kind',)).inc('x', amount=3)
+
+        with override_settings(METRICS_MULTIPROCESS_DIR=folder):
+            text = metrics.render()
+
+        self.assertIn('jobs_total{kind="x"} 5.0', text)
+        self.assertEqual(len(glob.glob(os.path.join(folder, '*.json'))), 2)
+
+    def test_reused_pid_keeps_old_file(self):
+        """test a worker that gets an exited worker's pid writes a new file"""
+        folder = tempfile.mkdtemp()
+        first, second = Registry(), Registry()
+        second.started = first.started + 1
+        for metrics in (first, second):
+            metrics.counter('jobs_total', 'Jobs.').inc()
+
+        with override_settings(METRICS_MULTIPROCESS_DIR=folder):
+            first.flush(force=True)
+            text = second.render()
+
+        self.assertEqual(len(glob.glob(os.path.join(folder, '*.json'))), 2)
+        self.assertIn('jobs_total 2.0', text)
+
+
+    def test_exited_workers_folded(self):
+        """test files of exited workers are merged into one and removed"""
+        folder = tempfile.mkdtemp()
+        gone = Registry()
+        gone.counter('jobs_total', 'Jobs.').inc(amount=2)
+        for started in (1, 2):
+            path = os.path.join(folder, f'metrics-999999-{started}.json')
+            with open(path, 'w') as target:
+                json.dump(gone.snapshot(), target)
+        metrics = Registry()
+        metrics.counter('jobs_total', 'Jobs.').inc()
+
+        with override_settings(METRICS_MULTIPROCESS_DIR=folder):
+            first = metrics.render()
+            second = metrics.render()
+
+        self.assertIn('jobs_total 5.0', first)
+        self.assertEqual(first, second)
+        self.assertEqual(sorted(glob.glob(os.path.join(folder, '*.json'))), [
+            os.path.join(folder, 'exited.json'),
+            os.path.join(folder, f'metrics-{metrics.pid}-{metrics.started}.json'),
+        ])
+
+
+class MetricsEndpointTests(TestCase):
+    """test the metrics endpoint and request instrumentation"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('met@met.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_requests_counted_per_route(self):
+        """test api requests are labelled with their view name"""
+        key = ('recipe:recipe-list', 'GET', '200')
+        before = REQUESTS.values.get(key, 0)
+
+        self.client.get(RECIPE_URL)
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(REQUESTS.values[key], before + 1)
+        text = res.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_bucket{route="recipe:recipe-list",'
+            'method="GET",le="+Inf"}', text
+        )
+        self.assertIn('db_queries_total{route="recipe:recipe-list"}', text)
+        self.assertEqual(registry.metrics['auth_token_cache_total'].kind, 'counter')
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token_required_when_set(self):
+        """test scrapers must present the configured bearer token"""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer s3cret')
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_remote_client_refused_without_token(self):
+        """test without a token only allowed networks are served"""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='203.0.113.5')
+
+        self.assertEqual(res.status_code, 403)
+        with override_settings(METRICS_ALLOWED_NETWORKS=['203.0.113.0/24']):
+            res = self.client.get(METRICS_URL, REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(res.status_code, 200)
+
+    def test_unknown_method_label(self):
+        """test made up request methods share one label"""
+        self.client.generic('BREW', RECIPE_URL)
+
+        self.assertNotIn('BREW', {key[1] for key in REQUESTS.values})
+        self.assertIn(
+            ('recipe:recipe-list', 'other', '405'), REQUESTS.values
+        )
@@ -0,0 +1,59 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag
+from core.profiling import RequestProfile
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RequestProfilingTests(TestCase):
+    """test sampled requests report their database and serializer time"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('prof@prof.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        Recipe.objects.create(
+            user=self.user, title='soup', time_minutes=5, price=5
+        ).tags.add(tag)
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_profiled(self):
+        """test the header and log line of a profiled request"""
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            res = self.client.get(RECIPE_URL)
+
+        self.assertIn('db;dur=', res['Server-Timing'])
+        self.assertIn('serializer;dur=', res['Server-Timing'])
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['view'], 'recipe:recipe-list')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['queries'], 0)
+        self.assertGreater(line['serializer_ms'], 0)
+
+    def test_unsampled_request_untouched(self):
+        """test requests outside the sample carry no timing header"""
+        res = self.client.get(RECIPE_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    def test_duplicates_fold_in_lists(self):
+        """test statements differing only in IN list length are grouped"""
+        profile = RequestProfile()
+        for sql in (
+                'SELECT * FROM t WHERE id IN (%s)',
+                'SELECT * FROM t WHERE id IN (%s, %s)',
+                'SELECT * FROM u WHERE id = %s'):
+            profile(lambda *args: None, sql, (), False, {})
+
+        duplicates = profile.duplicates()
+
+        self.assertEqual(profile.queries, 3)
+        self.assertEqual(len(duplicates), 1)
+        self.assertEqual(duplicates[0][1:], (2, 'SELECT * FROM t WHERE id IN (...)'))
@@ -0,0 +1,37 @@
+import ipaddress
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from core.metrics import registry
+
+
+def allowed_network(address):
+    """whether address lies in one of METRICS_ALLOWED_NETWORKS"""
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in settings.METRICS_ALLOWED_NETWORKS
+    )
+
+
+def metrics(request):
+    """serve the metrics of every worker to the scraper
+
+    with METRICS_TOKEN set the bearer token is required, otherwise only
+    clients from METRICS_ALLOWED_NETWORKS are served
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        if not constant_time_compare(
+                request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+            return HttpResponseForbidden()
+    elif not allowed_network(request.META.get('REMOTE_ADDR', '')):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
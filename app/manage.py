@@ -3,7 +3,10 @@ import os
 import sys
 
 if __name__ == '__main__':
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    os.environ.setdefault(
+        'DJANGO_SETTINGS_MODULE',
+        'app.test_settings' if sys.argv[1:2] == ['test'] else 'app.settings'
+    )
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -0,0 +1,292 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.counters import COUNTED, recount
+from recipe.fields import BatchedManyRelatedField
+
+
+def chunked(items, size):
+    """yield successive slices of items with at most size elements"""
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+def is_id(value):
+    """whether a raw json value can be a primary key"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def bulk_insert(model, objs, batch_size):
+    """insert objs in batches and make sure every obj ends up with a pk"""
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=batch_size)
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+def update_in_bulk(model, objs, field_names):
+    """update the given fields of objs with one UPDATE ... CASE statement"""
+    if not objs:
+        return
+    now = timezone.now()
+    updates = {
+        field.attname: now for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+    }
+    for name in field_names:
+        field = model._meta.get_field(name)
+        whens = [
+            When(pk=obj.pk, then=Value(getattr(obj, field.attname)))
+            for obj in objs
+        ]
+        updates[field.attname] = Case(
+            *whens, default=F(field.attname), output_field=field
+        )
+    if updates:
+        model.objects.filter(pk__in=[obj.pk for obj in objs]).update(**updates)
+
+
+class BulkModelMixin:
+    """list accepting create, update and delete for a user owned model"""
+    # None reads RECIPE_BULK_CHUNK_SIZE on every request
+    bulk_chunk_size = None
+    bulk_max_chunk_size = 5000
+
+    def get_bulk_chunk_size(self):
+        """return chunk size from the query string or the default"""
+        try:
+            size = int(self.request.query_params['chunk_size'])
+        except (KeyError, ValueError):
+            return self.bulk_chunk_size or getattr(
+                settings, 'RECIPE_BULK_CHUNK_SIZE', 500
+            )
+        return max(1, min(size, self.bulk_max_chunk_size))
+
+    def get_bulk_serializer_context(self, items, serializer_class):
+        """resolve all related ids of a chunk up front, one query per field"""
+        context = self.get_serializer_context()
+        fields = serializer_class(context=context).fields
+        resolved = {}
+        for name, field in fields.items():
+            if not isinstance(field, BatchedManyRelatedField):
+                continue
+            pks = set()
+            for item in items:
+                values = item.get(name) if isinstance(item, dict) else None
+                if isinstance(values, (list, tuple)):
+                    pks.update(
+                        value for value in values
+                        if isinstance(value, int) or str(value).isdigit()
+                    )
+            queryset = field.child_relation.get_queryset()
+            resolved[name] = queryset.in_bulk([int(pk) for pk in pks])
+        context['resolved_objects'] = resolved
+        return context
+
+    def _m2m_field_names(self, serializer_class):
+        model = serializer_class.Meta.model
+        return [
+            field.name for field in model._meta.many_to_many
+            if field.name in serializer_class.Meta.fields
+        ]
+
+    def _bulk_set_related(self, objs, related, replace):
+        """write through table rows for objs with bulk inserts"""
+        if not objs:
+            return
+        model = type(objs[0])
+        chunk_size = self.get_bulk_chunk_size()
+        for name, pairs in related.items():
+            if not pairs:
+                continue
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = field.m2m_column_name()
+            target = field.m2m_reverse_name()
+            touched = {value.pk for _, values in pairs for value in values}
+            if replace:
+                old = through.objects.filter(**{
+                    f'{source}__in': [obj.pk for obj, _ in pairs]
+                })
+                touched.update(old.values_list(target, flat=True))
+                old.delete()
+            # a repeated value would insert the same through row twice
+            keys = dict.fromkeys(
+                (obj.pk, value.pk) for obj, values in pairs for value in values
+            )
+            rows = [
+                through(**{source: obj_pk, target: value_pk})
+                for obj_pk, value_pk in keys
+            ]
+            through.objects.bulk_create(rows, batch_size=chunk_size)
+            # bulk writes skip the m2m signals, so recount what they touched
+            if field.related_model in COUNTED:
+                recount(field.related_model, touched)
+
+    def _validate_bulk_items(self, items, instances=None, rejected=None):
+        """validate items chunk by chunk and return data and indexed errors
+
+        rejected maps indexes to errors found before validation
+        """
+        rejected = rejected or {}
+        serializer_class = self.get_serializer_class()
+        validated, errors = [], []
+        for start, chunk in chunked(items, self.get_bulk_chunk_size()):
+            context = self.get_bulk_serializer_context(chunk, serializer_class)
+            for offset, item in enumerate(chunk):
+                index = start + offset
+                if index in rejected:
+                    errors.append({'index': index, 'errors': rejected[index]})
+                    continue
+                if instances is None:
+                    serializer = serializer_class(data=item, context=context)
+                else:
+                    instance = instances.get(index)
+                    if instance is None:
+                        errors.append({'index': index, 'errors': {
+                            'id': ['Object does not exist.']
+                        }})
+                        continue
+                    serializer = serializer_class(
+                        instance, data=item, partial=True, context=context
+                    )
+                if serializer.is_valid():
+                    validated.append((index, serializer.validated_data))
+                else:
+                    errors.append({'index': index, 'errors': serializer.errors})
+        return validated, errors
+
+    def _get_bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return None, Response(
+                {'detail': 'Expected a list of items.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return items, None
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """create, update or delete many objects in a single transaction"""
+        if request.method == 'POST':
+            return self.bulk_create(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_destroy(request)
+
+    def bulk_create(self, request):
+        items, error = self._get_bulk_items(request)
+        if error:
+            return error
+        validated, errors = self._validate_bulk_items(items)
+        if errors:
+            return Response(
+                {'errors': errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer_class = self.get_serializer_class()
+        model = serializer_class.Meta.model
+        m2m_names = self._m2m_field_names(serializer_class)
+        created = []
+        with transaction.atomic():
+            for _, chunk in chunked(validated, self.get_bulk_chunk_size()):
+                objs, related = [], {name: [] for name in m2m_names}
+                for _, data in chunk:
+                    data = dict(data)
+                    values = {name: data.pop(name, []) for name in m2m_names}
+                    obj = model(user=request.user, **data)
+                    objs.append(obj)
+                    for name in m2m_names:
+                        related[name].append((obj, values[name]))
+                bulk_insert(model, objs, len(objs))
+                self._bulk_set_related(objs, related, replace=False)
+                created.extend(obj.pk for obj in objs)
+            self.perform_bulk_write(created)
+
+        return Response(
+            {'count': len(created), 'ids': created},
+            status=status.HTTP_201_CREATED
+        )
+
+    def bulk_update(self, request):
+        items, error = self._get_bulk_items(request)
+        if error:
+            return error
+        model = self.get_serializer_class().Meta.model
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in items]
+        ids = [pk if is_id(pk) else None for pk in ids]
+        existing = model.objects.filter(
+            user=request.user, id__in=[pk for pk in ids if pk is not None]
+        ).in_bulk()
+        instances, rejected, seen = {}, {}, set()
+        for index, pk in enumerate(ids):
+            if pk not in existing:
+                continue
+            if pk in seen:
+                rejected[index] = {'id': ['Duplicate id.']}
+            else:
+                seen.add(pk)
+                instances[index] = existing[pk]
+        validated, errors = self._validate_bulk_items(
+            items, instances, rejected
+        )
+        if errors:
+            return Response(
+                {'errors': errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        m2m_names = self._m2m_field_names(self.get_serializer_class())
+        with transaction.atomic():
+            for _, chunk in chunked(validated, self.get_bulk_chunk_size()):
+                objs, changed = [], set()
+                related = {name: [] for name in m2m_names}
+                for index, data in chunk:
+                    obj = instances[index]
+                    for name, value in data.items():
+                        if name in m2m_names:
+                            related[name].append((obj, value))
+                        else:
+                            setattr(obj, name, value)
+                            changed.add(name)
+                    objs.append(obj)
+                update_in_bulk(model, objs, sorted(changed))
+                self._bulk_set_related(objs, related, replace=True)
+            self.perform_bulk_write([obj.pk for obj in instances.values()])
+
+        return Response({'count': len(validated)}, status=status.HTTP_200_OK)
+
+    def bulk_destroy(self, request):
+        items, error = self._get_bulk_items(request)
+        if error:
+            return error
+        model = self.get_serializer_class().Meta.model
+        existing = set(model.objects.filter(
+            user=request.user, id__in=[pk for pk in items if is_id(pk)]
+        ).values_list('id', flat=True))
+        errors = [
+            {'index': index, 'errors': {'id': ['Object does not exist.']}}
+            for index, pk in enumerate(items)
+            if not is_id(pk) or pk not in existing
+        ]
+        if errors:
+            return Response(
+                {'errors': errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        ids = list(existing)
+        with transaction.atomic():
+            for _, chunk in chunked(ids, self.get_bulk_chunk_size()):
+                model.objects.filter(user=request.user, id__in=chunk).delete()
+            self.perform_bulk_write(ids)
+
+        return Response({'count': len(ids)}, status=status.HTTP_200_OK)
+
+    def perform_bulk_write(self, ids):
+        """hook called inside the transaction after a bulk write"""
@@ -0,0 +1,78 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache import load_cache
+
+
+def get_response_cache():
+    """return the configured cache backend or None when caching is off"""
+    return load_cache('response', getattr(settings, 'RECIPE_RESPONSE_CACHE', {}))
+
+
+def generation_key(user_id):
+    return f'recipe:generation:{user_id}'
+
+
+def get_generation(backend, user_id):
+    """return the user generation, seeding it when missing or evicted"""
+    key = generation_key(user_id)
+    generation = backend.get(key)
+    if generation is None:
+        # seed from the clock so a lost counter never reuses an old value
+        generation = time.time_ns()
+        backend.set(key, generation)
+    return generation
+
+
+def bump_generation(user_id):
+    """invalidate every cached response of a user in O(1)"""
+    backend = get_response_cache()
+    if backend is not None:
+        get_generation(backend, user_id)
+        backend.incr(generation_key(user_id))
+
+
+class CachedResponseMixin:
+    """cache serialized list/retrieve responses per user and query string"""
+
+    def get_cache_key(self, backend, request):
+        user_id = request.user.pk
+        generation = get_generation(backend, user_id)
+        params = sorted(
+            (key, sorted(values)) for key, values in request.query_params.lists()
+        )
+        digest = hashlib.sha1(
+            repr((request.path, params)).encode('utf-8')
+        ).hexdigest()
+        return (
+            f'recipe:response:{user_id}:{generation}:'
+            f'{self.basename}:{self.action}:{digest}'
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """return a cached response or call handler and cache its data"""
+        backend = get_response_cache()
+        if backend is None:
+            return handler(request, *args, **kwargs)
+
+        key = self.get_cache_key(backend, request)
+        data = backend.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            timeout = settings.RECIPE_RESPONSE_CACHE.get('TIMEOUT')
+            backend.set(key, response.data, timeout)
+        return response
+
+    def invalidate_cache(self):
+        """bump the user generation now and again once the write commits"""
+        user_id = self.request.user.pk
+        bump_generation(user_id)
+        transaction.on_commit(lambda: bump_generation(user_id))
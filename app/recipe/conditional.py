@@ -0,0 +1,62 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import status
+
+
+class ConditionalGetMixin:
+    """answer If-None-Match/If-Modified-Since from cheap aggregate queries"""
+
+    def make_etag(self, request, *parts):
+        """build an etag from the request variant and the data version"""
+        source = repr((
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            request.user.pk,
+        ) + parts)
+        return quote_etag(hashlib.md5(source.encode('utf-8')).hexdigest())
+
+    def get_list_validators(self, request):
+        """return (etag, last_modified) for the list of the user"""
+        stats = self.queryset.model.objects.filter(
+            user=request.user
+        ).aggregate(count=Count('id'), last=Max('updated_at'))
+        return self.make_etag(request, stats['count'], stats['last']), None
+
+    def get_detail_validators(self, request, pk):
+        """return (etag, last_modified) for a single object of the user"""
+        model = self.queryset.model
+        try:
+            pk = model._meta.pk.to_python(pk)
+        except (ValidationError, ValueError, TypeError):
+            raise Http404
+        updated_at = model.objects.filter(
+            user=request.user, pk=pk
+        ).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None, None
+        return self.make_etag(request, updated_at), updated_at
+
+    def conditional_response(self, request, validators, handler):
+        """return 304 when the client copy is current, else call handler"""
+        etag, last_modified = validators
+        if etag is None:
+            return handler()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is not None:
+            return response
+
+        response = handler()
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,92 @@
+import csv
+import json
+from collections import defaultdict
+
+from django.conf import settings
+
+from core.models import Recipe
+
+FIELDS = ('id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients')
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+# separates tag and ingredient names inside one csv cell
+NAME_SEPARATOR = '|'
+
+
+def _names(relation, ids):
+    """{recipe id: [names]} of the tags or ingredients of ids, one query"""
+    field = Recipe._meta.get_field(relation)
+    names = defaultdict(list)
+    rows = field.remote_field.through.objects.filter(
+        recipe_id__in=ids
+    ).order_by(f'{field.m2m_reverse_field_name()}__name').values_list(
+        'recipe_id', f'{field.m2m_reverse_field_name()}__name'
+    )
+    for recipe_id, name in rows:
+        names[recipe_id].append(name)
+    return names
+
+
+def iter_recipes(user, chunk_size=None):
+    """yield every recipe of user as a dict with embedded names
+
+    recipes stream from a server-side cursor and names are fetched per chunk,
+    so memory depends on the chunk size and not on the catalogue size
+    """
+    chunk_size = chunk_size or settings.RECIPE_EXPORT_CHUNK_SIZE
+    recipes = Recipe.objects.filter(user=user).order_by('id').values_list(
+        'id', 'title', 'time_minutes', 'price', 'link'
+    ).iterator(chunk_size=chunk_size)
+
+    chunk = []
+    for row in recipes:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield from _with_names(chunk)
+            chunk = []
+    if chunk:
+        yield from _with_names(chunk)
+
+
+def _with_names(chunk):
+    ids = [row[0] for row in chunk]
+    tags = _names('tags', ids)
+    ingredients = _names('ingredients', ids)
+    for recipe_id, title, time_minutes, price, link in chunk:
+        yield {
+            'id': recipe_id,
+            'title': title,
+            'time_minutes': time_minutes,
+            'price': str(price),
+            'link': link,
+            'tags': tags.get(recipe_id, []),
+            'ingredients': ingredients.get(recipe_id, []),
+        }
+
+
+class _Echo:
+    """file-like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(recipes):
+    for recipe in recipes:
+        yield json.dumps(recipe, ensure_ascii=False) + '\n'
+
+
+def csv_lines(recipes):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for recipe in recipes:
+        yield writer.writerow([
+            NAME_SEPARATOR.join(recipe[field])
+            if field in ('tags', 'ingredients') else recipe[field]
+            for field in FIELDS
+        ])
+
+
+def export_lines(user, fmt, chunk_size=None):
+    """text lines of the export of user in the ndjson or csv format"""
+    lines = ndjson_lines if fmt == 'ndjson' else csv_lines
+    return lines(iter_recipes(user, chunk_size))
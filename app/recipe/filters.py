@@ -0,0 +1,28 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """?ordering= on one whitelisted field with id as tie breaker
+
+    the cursor paginator reads the ordering from here so keyset pages
+    follow the requested sort order
+    """
+
+    def get_ordering(self, request, queryset, view):
+        param = request.query_params.get(self.ordering_param)
+        if not param:
+            if request.query_params.get('search'):
+                # keep the rank order of search results
+                return None
+            return self.get_default_ordering(view)
+
+        field = param.strip()
+        if field.lstrip('-') not in view.ordering_fields:
+            raise ValidationError({self.ordering_param: [
+                'Expected one of: ' + ', '.join(view.ordering_fields) + '.'
+            ]})
+        if field.lstrip('-') == 'id':
+            return (field,)
+        tie_breaker = '-id' if field.startswith('-') else 'id'
+        return (field, tie_breaker)
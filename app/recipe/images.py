@@ -0,0 +1,248 @@
+import hashlib
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from core import metrics
+from core.models import Recipe
+from recipe.cache import bump_generation
+from recipe.renditions import generate_renditions
+from recipe.storage import store_content
+
+logger = logging.getLogger(__name__)
+
+PROCESSING_SECONDS = metrics.histogram(
+    'recipe_image_processing_seconds', 'Time to re-encode and store an upload.',
+    ('result',)
+)
+UPLOAD_BYTES = metrics.histogram(
+    'recipe_image_upload_bytes', 'Size of accepted image uploads.',
+    ('method',), buckets=metrics.SIZE_BUCKETS
+)
+
+EXIF_ORIENTATION = 0x0112
+ORIENTATION_TRANSPOSE = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+
+
+class ImageProcessingError(Exception):
+    """the upload could not be decoded as an image"""
+
+
+def _orientation(image):
+    getexif = getattr(image, '_getexif', None)
+    if getexif is None:
+        return None
+    try:
+        exif = getexif() or {}
+    except (AttributeError, KeyError, IndexError, TypeError, ValueError,
+            SyntaxError, OSError):
+        return None
+    return exif.get(EXIF_ORIENTATION)
+
+
+def reencode(source):
+    """decode source, bake in its orientation and drop all other metadata
+
+    returns the re-encoded bytes and the file extension to store them under
+    """
+    try:
+        image = Image.open(source)
+        image.load()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as exc:
+        raise ImageProcessingError(str(exc)) from exc
+
+    transpose = ORIENTATION_TRANSPOSE.get(_orientation(image))
+    icc_profile = image.info.get('icc_profile')
+    if transpose is not None:
+        image = image.transpose(transpose)
+
+    if image.mode in ('RGBA', 'LA') or (
+            image.mode == 'P' and 'transparency' in image.info):
+        fmt, ext, options = 'PNG', 'png', {'optimize': True}
+    else:
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        fmt, ext, options = 'JPEG', 'jpg', {
+            'quality': settings.RECIPE_IMAGE_JPEG_QUALITY,
+            'optimize': True,
+        }
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+
+    output = io.BytesIO()
+    image.save(output, format=fmt, **options)
+    return output.getvalue(), ext
+
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_stats = {
+    'queued': 0,
+    'running': 0,
+    'processed': 0,
+    'failed': 0,
+    'inline': 0,
+    'seconds': 0.0,
+    'max_seconds': 0.0,
+}
+
+
+def pipeline_stats():
+    """snapshot of the image pipeline counters of this process"""
+    with _lock:
+        return dict(_stats)
+
+
+def _count(**changes):
+    with _lock:
+        for key, value in changes.items():
+            _stats[key] += value
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-image'
+            )
+        return _executor
+
+
+def _get_slots():
+    global _slots
+    with _lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(
+                settings.RECIPE_IMAGE_WORKERS + settings.RECIPE_IMAGE_QUEUE_SIZE
+            )
+        return _slots
+
+
+def process_recipe_image(recipe_id, statuses=(Recipe.IMAGE_PENDING,)):
+    """re-encode the stored upload of a recipe and publish the result
+
+    returns the final image status, or None when another worker or a newer
+    upload got to the recipe first
+    """
+    recipe = Recipe.objects.filter(
+        pk=recipe_id, image_status__in=statuses
+    ).only('id', 'user_id', 'image').first()
+    if recipe is None or not recipe.image:
+        return None
+    raw_name = recipe.image.name
+    current = Recipe.objects.filter(pk=recipe_id, image=raw_name)
+    if not current.filter(image_status__in=statuses).update(
+            image_status=Recipe.IMAGE_PROCESSING):
+        return None
+
+    storage = recipe.image.storage
+    start = time.monotonic()
+    _count(running=1)
+    try:
+        with storage.open(raw_name) as source:
+            data, ext = reencode(source)
+        content_hash = hashlib.sha256(data).hexdigest()
+        name = store_content(storage, content_hash, data, ext)
+    except ImageProcessingError as exc:
+        logger.info('recipe %s image rejected: %s', recipe_id, exc)
+        current.update(
+            image=None,
+            image_status=Recipe.IMAGE_FAILED,
+            image_hash='',
+            updated_at=timezone.now()
+        )
+        storage.delete(raw_name)
+        result = Recipe.IMAGE_FAILED
+    except Exception:
+        # storage or database trouble, leave the upload for a retry by
+        # manage.py process_recipe_images instead of stuck in processing
+        logger.exception('recipe %s image processing failed', recipe_id)
+        current.filter(image_status=Recipe.IMAGE_PROCESSING).update(
+            image_status=Recipe.IMAGE_PENDING, updated_at=timezone.now()
+        )
+        result = Recipe.IMAGE_PENDING
+    else:
+        if current.update(
+                image=name,
+                image_status=Recipe.IMAGE_READY,
+                image_hash=content_hash,
+                updated_at=timezone.now()):
+            storage.delete(raw_name)
+            result = Recipe.IMAGE_READY
+            try:
+                generate_renditions(storage, content_hash, data)
+            except (OSError, ValueError):
+                # served lazily by the rendition view instead
+                logger.exception('renditions failed for recipe %s', recipe_id)
+        else:
+            # replaced by a newer upload while we were working, the stored
+            # copy may be shared and is left to garbage collection
+            result = None
+    finally:
+        elapsed = time.monotonic() - start
+        _count(running=-1)
+        with _lock:
+            _stats['seconds'] += elapsed
+            _stats['max_seconds'] = max(_stats['max_seconds'], elapsed)
+
+    if result == Recipe.IMAGE_READY:
+        _count(processed=1)
+    elif result in (Recipe.IMAGE_FAILED, Recipe.IMAGE_PENDING):
+        _count(failed=1)
+    logger.info('recipe %s image %s in %.3fs', recipe_id, result, elapsed)
+    PROCESSING_SECONDS.observe(elapsed, result or 'superseded')
+    bump_generation(recipe.user_id)
+    return result
+
+
+def _run(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('image processing failed for recipe %s', recipe_id)
+    finally:
+        _count(queued=-1)
+        _get_slots().release()
+        connection.close()
+
+
+def schedule_image_processing(recipe_id):
+    """hand the upload to the worker pool once the current transaction commits
+
+    when every worker and queue slot is taken the job runs in the calling
+    thread instead, which pushes back on clients rather than growing a backlog
+    """
+    def submit():
+        if _get_slots().acquire(blocking=False):
+            _count(queued=1)
+            _get_executor().submit(_run, recipe_id)
+            return
+        logger.warning('image queue full, processing recipe %s inline', recipe_id)
+        _count(inline=1)
+        try:
+            process_recipe_image(recipe_id)
+        except Exception:
+            # the upload is already committed, do not fail the response
+            logger.exception(
+                'image processing failed for recipe %s', recipe_id
+            )
+
+    transaction.on_commit(submit)
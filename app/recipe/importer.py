@@ -0,0 +1,128 @@
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from core.counters import recount
+from core.models import Ingredient, Recipe, Tag, User
+from core.search import update_search_index
+from recipe.bulk import bulk_insert
+from recipe.cache import bump_generation
+from recipe.export import NAME_SEPARATOR
+
+RELATED = (('tags', Tag), ('ingredients', Ingredient))
+VALUE_FIELDS = ('title', 'time_minutes', 'price', 'link')
+
+
+def read_records(stream, fmt):
+    """yield (line number, record) from an ndjson or csv text stream
+
+    records have the layout written by the export
+    """
+    if fmt == 'ndjson':
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError as exc:
+                yield number, exc
+        return
+
+    reader = csv.DictReader(stream)
+    for record in reader:
+        for name, _ in RELATED:
+            cell = record.get(name) or ''
+            record[name] = [value for value in cell.split(NAME_SEPARATOR) if value]
+        yield reader.line_num, record
+
+
+class RecipeImporter:
+    """write recipes of one user in batches, resolving names to ids"""
+
+    def __init__(self, user):
+        self.user = user
+        self.ids = {}
+        for relation, model in RELATED:
+            ids = {}
+            for pk, name in model.objects.filter(user=user).order_by(
+                    'id').values_list('id', 'name'):
+                ids.setdefault(name, pk)
+            self.ids[relation] = ids
+
+    def clean(self, record):
+        """validate a record against the model fields"""
+        if isinstance(record, Exception):
+            raise ValidationError(str(record))
+        if not isinstance(record, dict):
+            raise ValidationError('Expected an object.')
+        values = {}
+        for name in VALUE_FIELDS:
+            field = Recipe._meta.get_field(name)
+            value = record.get(name)
+            if value is None and field.blank:
+                value = field.get_default()
+            try:
+                values[name] = field.clean(value, None)
+            except ValidationError as exc:
+                raise ValidationError(f'{name}: {" ".join(exc.messages)}')
+        for relation, model in RELATED:
+            names = record.get(relation) or []
+            if not isinstance(names, list) or not all(
+                    isinstance(value, str) for value in names):
+                raise ValidationError(f'{relation}: expected a list of names')
+            field = model._meta.get_field('name')
+            try:
+                cleaned = [field.clean(value.strip(), None) for value in names]
+            except ValidationError as exc:
+                raise ValidationError(f'{relation}: {" ".join(exc.messages)}')
+            values[relation] = list(dict.fromkeys(cleaned))
+        return values
+
+    def _resolve(self, relation, model, names):
+        """ids of names, creating the missing ones with one bulk insert"""
+        ids = self.ids[relation]
+        missing = [name for name in dict.fromkeys(names) if name not in ids]
+        if missing:
+            created = bulk_insert(
+                model, [model(user=self.user, name=name) for name in missing],
+                len(missing)
+            )
+            for obj in created:
+                ids[obj.name] = obj.pk
+        return ids
+
+    def write(self, batch):
+        """insert a batch of cleaned records in one transaction"""
+        with transaction.atomic():
+            recipes = bulk_insert(Recipe, [
+                Recipe(user=self.user, **{
+                    name: values[name] for name in VALUE_FIELDS
+                })
+                for values in batch
+            ], len(batch))
+            for relation, model in RELATED:
+                ids = self._resolve(relation, model, [
+                    name for values in batch for name in values[relation]
+                ])
+                field = Recipe._meta.get_field(relation)
+                through = field.remote_field.through
+                rows = [
+                    through(**{
+                        field.m2m_column_name(): recipe.pk,
+                        field.m2m_reverse_name(): ids[name],
+                    })
+                    for recipe, values in zip(recipes, batch)
+                    for name in values[relation]
+                ]
+                through.objects.bulk_create(rows, batch_size=len(batch))
+                recount(model, {
+                    ids[name] for values in batch for name in values[relation]
+                })
+            update_search_index([recipe.pk for recipe in recipes])
+        return len(recipes)
+
+    def finish(self):
+        recount(User, [self.user.pk])
+        bump_generation(self.user.pk)
@@ -0,0 +1,96 @@
+import io
+import json
+import multiprocessing
+import resource
+import warnings
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from recipe.validators import validate_image_header
+
+
+def verify(data):
+    """what ImageField validation did: parse and verify the whole file"""
+    Image.open(io.BytesIO(data)).verify()
+
+
+def decode(data):
+    """full decode, the cost the image worker pays for accepted files"""
+    Image.open(io.BytesIO(data)).load()
+
+
+def header(data):
+    validate_image_header(ContentFile(data))
+
+
+MODES = {'verify': verify, 'decode': decode, 'header': header}
+
+
+def sample_files(photo_side, bomb_side):
+    """a noisy photo that compresses like a real one and a tiny png bomb"""
+    photo = io.BytesIO()
+    Image.effect_noise((photo_side, photo_side * 3 // 4), 64).convert(
+        'RGB'
+    ).save(photo, format='JPEG', quality=90)
+    bomb = io.BytesIO()
+    Image.new('L', (bomb_side, bomb_side)).save(bomb, format='PNG')
+    return {'photo': photo.getvalue(), 'bomb': bomb.getvalue()}
+
+
+def _measure(mode, data, runs, results):
+    warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+    Image.MAX_IMAGE_PIXELS = None
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    outcome = 'accepted'
+    for _ in range(runs):
+        try:
+            MODES[mode](data)
+        except Exception as exc:
+            outcome = f'rejected: {exc}'.splitlines()[0][:60]
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+    results.put({
+        'cpu_ms': round(cpu * 1000 / runs, 2),
+        # ru_maxrss is in KiB on linux
+        'peak_rss_mb': round((after.ru_maxrss - before.ru_maxrss) / 1024, 1),
+        'outcome': outcome,
+    })
+
+
+class Command(BaseCommand):
+    """Django command to compare the cost of image validation strategies"""
+    help = 'Measure per upload cpu time and peak RSS of image validation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--photo-side', type=int, default=4000)
+        parser.add_argument('--bomb-side', type=int, default=20000)
+        parser.add_argument('--json', help='also write the results to this file')
+
+    def handle(self, *args, **options):
+        files = sample_files(options['photo_side'], options['bomb_side'])
+        # every measurement runs in a fresh child so peak RSS is its own
+        context = multiprocessing.get_context('fork')
+        rows = []
+        for name, data in files.items():
+            for mode in MODES:
+                results = context.Queue()
+                child = context.Process(
+                    target=_measure,
+                    args=(mode, data, options['runs'], results)
+                )
+                child.start()
+                row = results.get()
+                child.join()
+                row.update(file=name, bytes=len(data), mode=mode)
+                rows.append(row)
+                self.stdout.write(
+                    '{file:6} {bytes:>9}B {mode:7} {cpu_ms:>10.2f}ms cpu '
+                    '{peak_rss_mb:>8.1f}MB peak  {outcome}'.format(**row)
+                )
+
+        if options['json']:
+            with open(options['json'], 'w') as target:
+                json.dump(rows, target, indent=2)
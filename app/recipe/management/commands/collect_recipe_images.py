@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.storage import collect_garbage
+from recipe.uploads import expire_uploads
+
+
+class Command(BaseCommand):
+    """Django command to delete recipe images no recipe refers to"""
+    help = (
+        'Garbage collect unreferenced recipe images and renditions '
+        'and expired chunked uploads'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='keep files younger than this many minutes'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='only report what would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        removed = collect_garbage(
+            Recipe._meta.get_field('image').storage,
+            grace=timedelta(minutes=options['grace_minutes']),
+            dry_run=options['dry_run'],
+        )
+        if not options['dry_run']:
+            expired = expire_uploads()
+            self.stdout.write(f'Expired {expired} chunked uploads')
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            '{} {} images, {} rendition sets and {} loose uploads'.format(
+                verb, removed['images'], removed['renditions'],
+                removed['uploads']
+            )
+        ))
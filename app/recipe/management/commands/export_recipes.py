@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.export import CONTENT_TYPES, export_lines
+
+
+class Command(BaseCommand):
+    """Django command to export the recipes of a user"""
+    help = 'Stream the recipes of a user as ndjson or csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='owner of the recipes')
+        parser.add_argument(
+            '--format', choices=sorted(CONTENT_TYPES), default='ndjson'
+        )
+        parser.add_argument('--output', help='file to write, stdout if omitted')
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        lines = export_lines(user, options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as target:
+                target.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
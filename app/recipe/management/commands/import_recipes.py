@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import RecipeImporter, read_records
+
+
+class Command(BaseCommand):
+    """Django command to bulk load recipes for a user"""
+    help = 'Import recipes from the ndjson or csv layout written by export_recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='owner of the imported recipes')
+        parser.add_argument('path', help="input file, '-' for stdin")
+        parser.add_argument('--format', choices=('ndjson', 'csv'))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='file recording how many records are committed, to resume'
+        )
+        parser.add_argument(
+            '--skip-invalid', action='store_true',
+            help='report and skip invalid records instead of stopping'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        checkpoint = options['checkpoint']
+        done = 0
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as source:
+                done = int(source.read().strip() or 0)
+            self.stdout.write(f'Resuming after {done} records')
+
+        importer = RecipeImporter(user)
+        stream = sys.stdin if path == '-' else open(
+            path, newline='', encoding='utf-8'
+        )
+        start = time.monotonic()
+        seen = imported = skipped = 0
+        batch = []
+
+        def flush():
+            nonlocal imported
+            imported += importer.write(batch)
+            batch.clear()
+            if checkpoint:
+                with open(checkpoint, 'w') as target:
+                    target.write(str(seen))
+            rate = imported / max(time.monotonic() - start, 1e-9)
+            self.stdout.write(f'{imported} recipes, {rate:.0f} rows/s')
+
+        try:
+            for number, record in read_records(stream, fmt):
+                seen += 1
+                if seen <= done:
+                    continue
+                try:
+                    batch.append(importer.clean(record))
+                except ValidationError as exc:
+                    message = f'line {number}: {" ".join(exc.messages)}'
+                    if not options['skip_invalid']:
+                        raise CommandError(message)
+                    self.stderr.write(message)
+                    skipped += 1
+                if len(batch) >= options['batch_size']:
+                    flush()
+            if batch:
+                flush()
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            importer.finish()
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes in {elapsed:.1f}s '
+            f'({imported / max(elapsed, 1e-9):.0f} rows/s), skipped {skipped}'
+        ))
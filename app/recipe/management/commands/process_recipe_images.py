@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.images import process_recipe_image
+
+
+class Command(BaseCommand):
+    """Django command to process recipe images left pending"""
+    help = 'Re-encode uploaded recipe images that are still pending'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stuck', action='store_true',
+            help='also retry images left in processing by a dead worker'
+        )
+
+    def handle(self, *args, **options):
+        statuses = [Recipe.IMAGE_PENDING]
+        if options['stuck']:
+            statuses.append(Recipe.IMAGE_PROCESSING)
+        ids = Recipe.objects.filter(
+            image_status__in=statuses
+        ).order_by('id').values_list('id', flat=True)
+
+        results = {}
+        for recipe_id in ids.iterator():
+            result = process_recipe_image(recipe_id, statuses)
+            results[result] = results.get(result, 0) + 1
+        self.stdout.write(self.style.SUCCESS(
+            'Images ready: {}, failed: {}, left pending: {}, skipped: {}'.format(
+                results.get(Recipe.IMAGE_READY, 0),
+                results.get(Recipe.IMAGE_FAILED, 0),
+                results.get(Recipe.IMAGE_PENDING, 0),
+                results.get(None, 0),
+            )
+        ))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone, User
+
+
+class Command(BaseCommand):
+    """Django command to delete sync tombstones no client can ask for"""
+    help = 'Delete tombstones older than the sync retention and of deleted users'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.RECIPE_SYNC_TOMBSTONE_DAYS,
+            help='keep tombstones younger than this many days'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        orphaned, _ = Tombstone.objects.exclude(
+            user_id__in=User.objects.values('id')
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {expired} expired and {orphaned} orphaned tombstones'
+        ))
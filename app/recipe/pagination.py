@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination,LimitOffsetPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """keyset pagination over the descending recipe id"""
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class NameCursorPagination(RecipeCursorPagination):
+    """keyset pagination over descending name with id as tie breaker"""
+    ordering = ('-name', '-id')
+
+
+class SearchPagination(LimitOffsetPagination):
+    """limit/offset pages for results ordered by search rank"""
+    max_limit = 500
@@ -0,0 +1,83 @@
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+# extension -> (pillow format, save options)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+
+def rendition_widths():
+    return settings.RECIPE_IMAGE_RENDITION_WIDTHS
+
+
+def rendition_formats():
+    """configured formats this pillow build can write"""
+    return [
+        ext for ext in settings.RECIPE_IMAGE_RENDITION_FORMATS
+        if ext in FORMATS and (ext != 'webp' or features.check('webp'))
+    ]
+
+
+def rendition_name(content_hash, width, ext):
+    return f'renditions/{content_hash[:2]}/{content_hash}/{width}.{ext}'
+
+
+def rendition_urls(content_hash, request=None):
+    """{width: {ext: url}} for every rendition of an image"""
+    urls = {}
+    for width in rendition_widths():
+        urls[str(width)] = {}
+        for ext in rendition_formats():
+            url = reverse('recipe:rendition', kwargs={
+                'content_hash': content_hash, 'width': width, 'ext': ext
+            })
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[str(width)][ext] = url
+    return urls
+
+
+def render(data, width, ext):
+    """scale the image in data down to width and encode it as ext"""
+    image = Image.open(io.BytesIO(data))
+    if image.width > width:
+        size = (width, max(1, round(image.height * width / image.width)))
+        # let the jpeg decoder skip detail we are about to throw away
+        image.draft('RGB', size)
+        image = image.resize(size, Image.LANCZOS)
+    fmt, options = FORMATS[ext]
+    if fmt == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    output = io.BytesIO()
+    image.save(output, format=fmt, **options)
+    return output.getvalue()
+
+
+def save_rendition(storage, content_hash, data, width, ext):
+    """store one rendition unless it exists and return its name"""
+    name = rendition_name(content_hash, width, ext)
+    if storage.exists(name):
+        return name
+    saved = storage.save(name, ContentFile(render(data, width, ext)))
+    if saved != name:
+        # another worker wrote the same rendition in the meantime
+        storage.delete(saved)
+    return name
+
+
+def generate_renditions(storage, content_hash, data):
+    """store every configured rendition of the image bytes in data"""
+    for width in rendition_widths():
+        for ext in rendition_formats():
+            save_rendition(storage, content_hash, data, width, ext)
@@ -1,11 +1,20 @@
+import os
+import re
+from django.conf import settings
 from rest_framework import serializers
-from core.models import Tag,Ingredient,Recipe
+from core.models import Tag,Ingredient,Recipe,ImageUpload
+from recipe.fields import UserPrimaryKeyRelatedField
+from recipe.renditions import rendition_urls
+from recipe.validators import validate_image_header
 
 
 class TagSerializer(serializers.ModelSerializer):
+    # only rendered when the queryset was annotated with usage_count
+    usage_count = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Tag
-        fields = ['id','name']
+        fields = ['id','name','usage_count']
         read_only_fields = ['id']
 
 
@@ -13,29 +22,48 @@ class TagSerializer(serializers.ModelSerializer):
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for an ingredient object"""
+    usage_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Ingredient
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'usage_count')
         read_only_fields = ('id',)
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     """serialize the recipe object"""
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
     many=True,
     queryset = Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
     many=True,
     queryset = Tag.objects.all()
     )
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id','title','price','time_minutes','ingredients','tags','link')
-        read_only_fields=('id',)
+        fields = ('id','title','price','time_minutes','ingredients','tags','link','image_status','image_renditions')
+        read_only_fields=('id','image_status')
+
+    def get_image_renditions(self, obj):
+        """urls of the resized copies of the image by width and format"""
+        if not obj.image_hash:
+            return None
+        return rendition_urls(obj.image_hash, self.context.get('request'))
+
+    def create(self,validated_data):
+        """create recipe and attach the already resolved related objects"""
+        ingredients = validated_data.pop('ingredients',[])
+        tags = validated_data.pop('tags',[])
+        recipe = Recipe.objects.create(**validated_data)
+        if ingredients:
+            recipe.ingredients.add(*ingredients)
+        if tags:
+            recipe.tags.add(*tags)
+        return recipe
 
 class RecipeDetailSerializer(RecipeSerializer):
     """serialize the recipe detail"""
@@ -47,8 +75,39 @@ class RecipeDetailSerializer(RecipeSerializer):
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipe"""
+    # only the header is checked here, decoding is left to the image pipeline
+    image = serializers.FileField(validators=[validate_image_header])
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status')
+        read_only_fields = ('id', 'image_status')
+
+    def update(self, instance, validated_data):
+        """save only the image columns, leaving the search data alone"""
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """Serializer for a resumable image upload"""
+
+    class Meta:
+        model = ImageUpload
+        fields = ('id', 'filename', 'size', 'received', 'created_at')
+        read_only_fields = ('id', 'received', 'created_at')
+
+    def validate_filename(self, value):
+        value = os.path.basename(value)
+        if not re.match(r'^[\w\- ]+\.\w+$', value):
+            raise serializers.ValidationError('Invalid file name.')
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.RECIPE_UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(
+                f'Expected 1 to {settings.RECIPE_UPLOAD_MAX_BYTES} bytes.'
+            )
+        return value
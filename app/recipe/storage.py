@@ -0,0 +1,133 @@
+import os
+import re
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from core.models import Recipe, recipe_image_content_path
+
+IMAGE_ROOT = 'uploads/recipe'
+RENDITION_ROOT = 'renditions'
+HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+BATCH_SIZE = 1000
+
+
+def store_content(storage, content_hash, data, ext):
+    """store image bytes once under their hash and return the name"""
+    name = recipe_image_content_path(content_hash, ext)
+    if storage.exists(name):
+        _touch(storage, name)
+        return name
+    saved = storage.save(name, ContentFile(data))
+    if saved != name:
+        # identical bytes written concurrently by another worker
+        storage.delete(saved)
+    return name
+
+
+def _touch(storage, name):
+    """mark a reused file as fresh so collection keeps it"""
+    try:
+        os.utime(storage.path(name))
+    except (NotImplementedError, OSError):
+        pass
+
+
+def _subdirs(storage, path):
+    if not storage.exists(path):
+        return []
+    return storage.listdir(path)[0]
+
+
+def _files(storage, path):
+    if not storage.exists(path):
+        return []
+    return storage.listdir(path)[1]
+
+
+def _batches(items):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _stored_images(storage):
+    """(hash, name) of every content addressed image file"""
+    for first in _subdirs(storage, IMAGE_ROOT):
+        for second in _subdirs(storage, f'{IMAGE_ROOT}/{first}'):
+            folder = f'{IMAGE_ROOT}/{first}/{second}'
+            for filename in _files(storage, folder):
+                content_hash = os.path.splitext(filename)[0]
+                if HASH_RE.match(content_hash):
+                    yield content_hash, f'{folder}/{filename}'
+
+
+def _stored_renditions(storage):
+    """(hash, folder) of every rendition folder"""
+    for shard in _subdirs(storage, RENDITION_ROOT):
+        for content_hash in _subdirs(storage, f'{RENDITION_ROOT}/{shard}'):
+            if HASH_RE.match(content_hash):
+                yield content_hash, f'{RENDITION_ROOT}/{shard}/{content_hash}'
+
+
+def _loose_uploads(storage):
+    """uploads kept under their original uuid name, in flight or legacy"""
+    for filename in _files(storage, IMAGE_ROOT):
+        yield f'{IMAGE_ROOT}/{filename}'
+
+
+def collect_garbage(storage, grace=timedelta(hours=1), dry_run=False):
+    """delete image files and renditions no recipe refers to any more
+
+    the reference count of a stored image is the number of recipes carrying
+    its hash, read from the indexed image_hash column; files younger than grace are kept so uploads that are still being
+    published are never removed under a worker
+    """
+    cutoff = timezone.now() - grace
+    removed = {'images': 0, 'renditions': 0, 'uploads': 0}
+
+    def old(name):
+        return storage.get_modified_time(name) < cutoff
+
+    def delete(name):
+        if not dry_run:
+            storage.delete(name)
+
+    for batch in _batches(_stored_images(storage)):
+        used = set(Recipe.objects.filter(
+            image_hash__in=[content_hash for content_hash, _ in batch]
+        ).values_list('image_hash', flat=True))
+        for content_hash, name in batch:
+            if content_hash not in used and old(name):
+                delete(name)
+                removed['images'] += 1
+
+    for batch in _batches(_stored_renditions(storage)):
+        used = set(Recipe.objects.filter(
+            image_hash__in=[content_hash for content_hash, _ in batch]
+        ).values_list('image_hash', flat=True))
+        for content_hash, folder in batch:
+            if content_hash in used:
+                continue
+            names = [f'{folder}/{filename}' for filename in _files(storage, folder)]
+            if names and all(old(name) for name in names):
+                for name in names:
+                    delete(name)
+                removed['renditions'] += 1
+
+    for batch in _batches(_loose_uploads(storage)):
+        used = set(Recipe.objects.filter(
+            image__in=batch
+        ).values_list('image', flat=True))
+        for name in batch:
+            if name not in used and old(name):
+                delete(name)
+                removed['uploads'] += 1
+
+    return removed
@@ -0,0 +1,30 @@
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import override_settings
+
+
+def use_temp_media(test):
+    """point MEDIA_ROOT and the upload temp dir of a test at fresh folders
+
+    both are removed when the test finishes, so tests that store or collect
+    images never touch files of the configured media root
+    """
+    for name in ('MEDIA_ROOT', 'RECIPE_UPLOAD_TEMP_DIR'):
+        folder = tempfile.mkdtemp()
+        test.addCleanup(shutil.rmtree, folder, True)
+        override = override_settings(**{name: folder})
+        override.enable()
+        test.addCleanup(override.disable)
+
+
+def run_commit_hooks():
+    """run the transaction.on_commit callbacks queued so far
+
+    TestCase never commits, so work deferred to commit like search index
+    refreshes would otherwise not happen
+    """
+    hooks, connection.run_on_commit = connection.run_on_commit, []
+    for _, hook in hooks:
+        hook()
@@ -0,0 +1,175 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from core.models import Recipe,Tag,Ingredient
+from recipe.views import TagViewSet
+
+
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+TAG_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENT_BULK_URL = reverse('recipe:ingredient-bulk')
+
+
+class BulkApiTest(TestCase):
+    """test the bulk create, update and delete endpoints"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('bulk@bulk.com','123456789')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_create_tags(self):
+        """test creating many tags in one request"""
+        payload = [{'name': f'tag {i}'} for i in range(5)]
+        res = self.client.post(
+            TAG_BULK_URL + '?chunk_size=2', payload, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['count'], 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 5)
+
+    def test_chunk_size_setting_read_per_request(self):
+        """test the default chunk size follows the current settings"""
+        view = TagViewSet()
+        view.request = Request(APIRequestFactory().post(TAG_BULK_URL))
+
+        with override_settings(RECIPE_BULK_CHUNK_SIZE=7):
+            self.assertEqual(view.get_bulk_chunk_size(), 7)
+
+    def test_bulk_create_reports_item_errors(self):
+        """test invalid items are reported by index and nothing is saved"""
+        payload = [{'name': 'Salt'}, {'name': ''}, {'name': 'Pepper'}]
+        res = self.client.post(INGREDIENT_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['index'] for e in res.data['errors']], [1])
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_bulk_create_recipes_with_relations(self):
+        """test recipes are created with their tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        payload = [
+            {'title': f'recipe {i}', 'price': '5.00', 'time_minutes': 10,
+             'tags': [tag.id], 'ingredients': [ingredient.id]}
+            for i in range(3)
+        ]
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [tag])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+        self.user.refresh_from_db()
+        tag.refresh_from_db()
+        self.assertEqual((self.user.recipe_count, tag.recipe_count), (3, 3))
+
+    def test_bulk_create_recipes_rejects_other_users_tags(self):
+        """test related ids owned by someone else fail validation"""
+        user2 = get_user_model().objects.create_user('other@bulk.com','123456789')
+        tag = Tag.objects.create(user=user2, name='Vegan')
+        payload = [{'title': 'soup', 'price': '5.00', 'time_minutes': 10,
+                    'tags': [tag.id], 'ingredients': []}]
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data['errors'][0]['errors'])
+
+    def test_bulk_update_recipes(self):
+        """test updating fields and relations of many recipes"""
+        old_tag = Tag.objects.create(user=self.user, name='Old')
+        new_tag = Tag.objects.create(user=self.user, name='New')
+        recipes = []
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'recipe {i}', time_minutes=5, price=5
+            )
+            recipe.tags.add(old_tag)
+            recipes.append(recipe)
+        payload = [{'id': r.id, 'time_minutes': 30, 'tags': [new_tag.id]}
+                   for r in recipes]
+        res = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.time_minutes, 30)
+            self.assertEqual(list(recipe.tags.all()), [new_tag])
+        old_tag.refresh_from_db()
+        new_tag.refresh_from_db()
+        self.assertEqual((old_tag.recipe_count, new_tag.recipe_count), (0, 3))
+
+    def test_bulk_update_unknown_id(self):
+        """test updating an id that is not owned by the user fails"""
+        user2 = get_user_model().objects.create_user('other@bulk.com','123456789')
+        tag = Tag.objects.create(user=user2, name='Vegan')
+        res = self.client.patch(
+            TAG_BULK_URL, [{'id': tag.id, 'name': 'Meat'}], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_bulk_update_duplicate_id(self):
+        """test an id repeated in one update is rejected at the later index"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=5
+        )
+        payload = [
+            {'id': recipe.id, 'tags': [tag.id]},
+            {'id': recipe.id, 'tags': [tag.id], 'title': 'Stew'},
+        ]
+        res = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'], [
+            {'index': 1, 'errors': {'id': ['Duplicate id.']}}
+        ])
+
+    def test_bulk_update_repeated_tag(self):
+        """test a tag listed twice for one recipe is linked once"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=5
+        )
+        res = self.client.patch(
+            RECIPE_BULK_URL, [{'id': recipe.id, 'tags': [tag.id, tag.id]}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.tags.all()), [tag])
+
+    def test_bulk_malformed_ids(self):
+        """test ids that are not integers are reported per item"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.delete(
+            TAG_BULK_URL, [{'id': tag.id}, True, tag.id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['index'] for e in res.data['errors']], [0, 1])
+        res = self.client.patch(
+            TAG_BULK_URL, [{'id': {'x': 1}, 'name': 'Meat'}], format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Tag.objects.filter(id=tag.id).exists())
+
+    def test_bulk_delete_tags(self):
+        """test deleting many tags by id"""
+        tags = [Tag.objects.create(user=self.user, name=f'tag {i}')
+                for i in range(3)]
+        res = self.client.delete(
+            TAG_BULK_URL, [tag.id for tag in tags[:2]], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(Tag.objects.all()), [tags[2]])
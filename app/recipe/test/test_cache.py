@@ -0,0 +1,67 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.models import Recipe,Tag
+from recipe.cache import get_response_cache
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+LRU_CACHE = {
+    'BACKEND': 'core.cache.LocalLRUCache',
+    'OPTIONS': {'max_entries': 100},
+    'TIMEOUT': 60,
+}
+
+
+@override_settings(RECIPE_RESPONSE_CACHE=LRU_CACHE)
+class CachedResponseTest(TestCase):
+    """test list responses are cached and invalidated on write"""
+
+    def setUp(self):
+        get_response_cache().clear()
+        self.user = get_user_model().objects.create_user('cache@cache.com','123456789')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """test the second identical request only runs the etag query"""
+        Recipe.objects.create(user=self.user, title='soup', time_minutes=5, price=5)
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(first.data, second.data)
+
+    def test_tag_list_served_from_cache(self):
+        """test tag lists are cached without touching the database"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_create_invalidates_cache(self):
+        """test a write through the api is visible on the next read"""
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_is_per_user(self):
+        """test users never see each other's cached responses"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        user2 = get_user_model().objects.create_user('other@cache.com','123456789')
+        self.client.force_authenticate(user=user2)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
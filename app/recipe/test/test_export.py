@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Ingredient, Recipe, Tag
+
+
+EXPORT_URL = reverse('recipe:export')
+
+
+def content(response):
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+class ExportTests(TestCase):
+    """test the streaming catalogue export"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('exp@exp.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        kale = Ingredient.objects.create(user=self.user, name='Kale')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Salad {i}', time_minutes=5, price=2.5
+            )
+            recipe.tags.add(vegan)
+            recipe.ingredients.add(kale, salt)
+            self.recipes.append(recipe)
+        other = get_user_model().objects.create_user('o@o.com', 'testpass')
+        Recipe.objects.create(user=other, title='Hidden', time_minutes=1, price=1)
+
+    def test_export_ndjson(self):
+        """test every recipe of the user streams with embedded names"""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        rows = [json.loads(line) for line in content(res).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [r.id for r in self.recipes])
+        self.assertEqual(rows[0]['tags'], ['Vegan'])
+        self.assertEqual(rows[0]['ingredients'], ['Kale', 'Salt'])
+        self.assertEqual(rows[0]['price'], '2.50')
+
+    def test_export_queries_per_chunk(self):
+        """test names are fetched per chunk rather than per recipe"""
+        with self.settings(RECIPE_EXPORT_CHUNK_SIZE=2):
+            res = self.client.get(EXPORT_URL)
+            # one recipe cursor plus two name queries for each of 3 chunks
+            with self.assertNumQueries(7):
+                content(res)
+
+    def test_export_csv(self):
+        """test the csv export joins names into one cell"""
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+        rows = list(csv.DictReader(io.StringIO(content(res))))
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['ingredients'], 'Kale|Salt')
+
+    def test_export_command(self):
+        """test the command writes the same ndjson stream"""
+        out = io.StringIO()
+
+        call_command('export_recipes', 'exp@exp.com', stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
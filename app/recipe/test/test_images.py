@@ -0,0 +1,233 @@
+import io
+from unittest.mock import patch
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from PIL import Image
+from core.models import Recipe
+from recipe.images import process_recipe_image, reencode
+from recipe.renditions import rendition_name
+from recipe.test.helpers import use_temp_media
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def jpeg_bytes(size=(20, 10), **options):
+    output = io.BytesIO()
+    Image.new('RGB', size, 'red').save(output, format='JPEG', **options)
+    return output.getvalue()
+
+
+def exif_with_orientation(orientation):
+    """minimal little endian tiff block holding a single orientation tag"""
+    return (
+        b'Exif\x00\x00II*\x00\x08\x00\x00\x00\x01\x00'
+        b'\x12\x01\x03\x00\x01\x00\x00\x00'
+        + bytes([orientation, 0, 0, 0]) + b'\x00\x00\x00\x00'
+    )
+
+
+class ImagePipelineTests(TestCase):
+    """test uploads are re-encoded outside the request"""
+
+    def setUp(self):
+        use_temp_media(self)
+        self.user = get_user_model().objects.create_user('img@img.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=5, price=5
+        )
+
+    def store_upload(self, data, name='upload.jpg'):
+        self.recipe.image.save(name, ContentFile(data), save=False)
+        self.recipe.image_status = Recipe.IMAGE_PENDING
+        self.recipe.save()
+
+    def test_reencode_applies_orientation_and_drops_exif(self):
+        """test rotation is baked in and no exif survives"""
+        data = jpeg_bytes(exif=exif_with_orientation(6))
+
+        output, ext = reencode(io.BytesIO(data))
+
+        image = Image.open(io.BytesIO(output))
+        self.assertEqual(ext, 'jpg')
+        self.assertEqual(image.size, (10, 20))
+        self.assertNotIn('exif', image.info)
+
+    @override_settings(RECIPE_IMAGE_ASYNC=True)
+    def test_upload_accepted_then_processed(self):
+        """test the upload returns pending and the worker publishes it"""
+        upload = io.BytesIO(jpeg_bytes())
+        upload.name = 'photo.jpg'
+        res = self.client.post(
+            image_upload_url(self.recipe.id), {'image': upload},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        raw_name = Recipe.objects.get(id=self.recipe.id).image.name
+
+        result = process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(result, Recipe.IMAGE_READY)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertNotEqual(self.recipe.image.name, raw_name)
+        self.assertFalse(self.recipe.image.storage.exists(raw_name))
+        self.recipe.image.delete()
+
+    def test_undecodable_upload_fails(self):
+        """test bytes that are not an image end up failed and removed"""
+        self.store_upload(b'not an image')
+        raw_name = self.recipe.image.name
+
+        result = process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(result, Recipe.IMAGE_FAILED)
+        self.assertFalse(self.recipe.image)
+        self.assertFalse(self.recipe.image.storage.exists(raw_name))
+
+    def test_storage_error_left_pending(self):
+        """test a processing crash hands the upload back for a retry"""
+        self.store_upload(jpeg_bytes())
+
+        with patch('recipe.images.store_content', side_effect=OSError):
+            result = process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(result, Recipe.IMAGE_PENDING)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
+        self.assertEqual(process_recipe_image(self.recipe.id), Recipe.IMAGE_READY)
+
+    def test_command_drains_pending(self):
+        """test the command processes uploads left pending"""
+        self.store_upload(jpeg_bytes())
+
+        call_command('process_recipe_images', stdout=io.StringIO())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.recipe.image.delete()
+
+
+class RenditionTests(TestCase):
+    """test resized copies are stored by hash and served lazily"""
+
+    def setUp(self):
+        use_temp_media(self)
+        self.user = get_user_model().objects.create_user('rend@rend.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=5, price=5
+        )
+        self.recipe.image.save(
+            'upload.jpg', ContentFile(jpeg_bytes(size=(1600, 800))), save=False
+        )
+        self.recipe.image_status = Recipe.IMAGE_PENDING
+        self.recipe.save()
+        process_recipe_image(self.recipe.id)
+        self.recipe.refresh_from_db()
+        self.storage = self.recipe.image.storage
+
+    def tearDown(self):
+        self.recipe.image.delete()
+
+    def test_renditions_generated_with_processing(self):
+        """test every width and format is stored under the content hash"""
+        name = rendition_name(self.recipe.image_hash, 200, 'webp')
+
+        with self.storage.open(name) as rendition:
+            image = Image.open(rendition)
+            self.assertEqual((image.format, image.size), ('WEBP', (200, 100)))
+        self.assertTrue(self.storage.exists(
+            rendition_name(self.recipe.image_hash, 1200, 'jpg')
+        ))
+
+    def test_rendition_urls_in_recipe(self):
+        """test recipe responses link every rendition"""
+        res = self.client.get(reverse('recipe:recipe-detail', args=[self.recipe.id]))
+
+        renditions = res.data['image_renditions']
+        self.assertEqual(sorted(renditions, key=int), ['200', '600', '1200'])
+        self.assertIn(self.recipe.image_hash, renditions['600']['jpg'])
+
+    def test_missing_rendition_generated_on_request(self):
+        """test a deleted rendition is rebuilt and redirected to"""
+        name = rendition_name(self.recipe.image_hash, 600, 'jpg')
+        self.storage.delete(name)
+        url = reverse('recipe:rendition', kwargs={
+            'content_hash': self.recipe.image_hash, 'width': 600, 'ext': 'jpg'
+        })
+
+        res = APIClient().get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(res['Location'], self.storage.url(name))
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertTrue(self.storage.exists(name))
+
+    def test_unknown_rendition_width(self):
+        """test widths outside the configured set are not generated"""
+        url = reverse('recipe:rendition', kwargs={
+            'content_hash': self.recipe.image_hash, 'width': 333, 'ext': 'jpg'
+        })
+
+        res = APIClient().get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class HeaderValidationTests(TestCase):
+    """test uploads are screened from their header before being stored"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('head@head.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=5, price=5
+        )
+
+    def upload(self, data, name='photo.jpg'):
+        upload = io.BytesIO(data)
+        upload.name = name
+        return self.client.post(
+            image_upload_url(self.recipe.id), {'image': upload},
+            format='multipart'
+        )
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100 * 100)
+    def test_too_many_pixels_rejected(self):
+        """test dimensions over the pixel budget are refused unstored"""
+        res = self.upload(jpeg_bytes(size=(200, 200)))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_unsupported_format_rejected(self):
+        """test formats outside the allowed list are refused"""
+        output = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(output, format='GIF')
+
+        res = self.upload(output.getvalue(), name='anim.gif')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('format', str(res.data['image']))
+
+    @override_settings(RECIPE_UPLOAD_MAX_BYTES=100)
+    def test_too_many_bytes_rejected(self):
+        """test files over the byte cap are refused"""
+        res = self.upload(jpeg_bytes())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
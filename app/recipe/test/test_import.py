@@ -0,0 +1,107 @@
+import io
+import json
+import os
+import tempfile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from core.models import Ingredient, Recipe, Tag
+
+
+def record(i, tags=('Vegan',), ingredients=('Kale',)):
+    return {
+        'title': f'Salad {i}', 'time_minutes': 5, 'price': '2.50',
+        'link': '', 'tags': list(tags), 'ingredients': list(ingredients),
+    }
+
+
+class ImportCommandTests(TestCase):
+    """test bulk loading recipes with import_recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('imp@imp.com', 'testpass')
+        self.folder = tempfile.mkdtemp()
+
+    def write(self, name, text):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w') as target:
+            target.write(text)
+        return path
+
+    def run_import(self, path, *args):
+        call_command(
+            'import_recipes', 'imp@imp.com', path, *args,
+            stdout=io.StringIO(), stderr=io.StringIO()
+        )
+
+    def test_import_ndjson_resolves_names(self):
+        """test names map onto existing rows and missing ones are created"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        lines = [record(0), record(1, tags=('Vegan', 'Quick'))]
+        path = self.write('in.ndjson', ''.join(json.dumps(r) + '\n' for r in lines))
+
+        self.run_import(path, '--batch-size', '1')
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(recipes.count(), 2)
+        self.assertEqual(
+            sorted(recipes[1].tags.values_list('name', flat=True)),
+            ['Quick', 'Vegan']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        vegan.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual((vegan.recipe_count, self.user.recipe_count), (2, 2))
+
+    def test_import_csv(self):
+        """test the csv layout of the export is accepted"""
+        path = self.write(
+            'in.csv',
+            'id,title,time_minutes,price,link,tags,ingredients\n'
+            '1,Soup,20,4.00,,Winter|Warm,Leek\n'
+        )
+
+        self.run_import(path)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.tags.count(), 2)
+
+    def test_resume_from_checkpoint(self):
+        """test records already committed are not imported again"""
+        path = self.write(
+            'in.ndjson', ''.join(json.dumps(record(i)) + '\n' for i in range(3))
+        )
+        checkpoint = self.write('checkpoint', '2')
+
+        self.run_import(path, '--checkpoint', checkpoint)
+
+        titles = list(Recipe.objects.values_list('title', flat=True))
+        self.assertEqual(titles, ['Salad 2'])
+        with open(checkpoint) as source:
+            self.assertEqual(source.read(), '3')
+
+    def test_invalid_record(self):
+        """test invalid records stop the import unless skipped"""
+        bad = dict(record(1), time_minutes='soon')
+        path = self.write(
+            'in.ndjson', json.dumps(record(0)) + '\n' + json.dumps(bad) + '\n'
+        )
+
+        with self.assertRaises(CommandError):
+            self.run_import(path)
+        self.run_import(path, '--skip-invalid')
+
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_invalid_names(self):
+        """test blank and overlong names are rejected after stripping"""
+        for tags in ((' ',), ('x' * 256,)):
+            path = self.write('in.ndjson', json.dumps(record(0, tags=tags)) + '\n')
+
+            with self.assertRaises(CommandError):
+                self.run_import(path)
+
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Tag.objects.exists())
@@ -45,7 +45,7 @@ class PrivateIngredientsAPITests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test that only ingredients for authenticated user are returned"""
@@ -60,8 +60,8 @@ class PrivateIngredientsAPITests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
 
     def test_create_ingredient_succesfully(self):
@@ -89,8 +89,8 @@ class PrivateIngredientsAPITests(TestCase):
         serializer1 = IngredientSerializer(ingredient1)
         serializer2  = IngredientSerializer(ingredient2)
 
-        self.assertIn(serializer1.data,res.data)
-        self.assertNotIn(serializer2.data,res.data)
+        self.assertIn(serializer1.data,res.data['results'])
+        self.assertNotIn(serializer2.data,res.data['results'])
 
 
     def test_retrieve_ingredients_unique(self):
@@ -107,4 +107,4 @@ class PrivateIngredientsAPITests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL,{'assigned_only':1})
 
-        self.assertEqual(len(res.data),1)
+        self.assertEqual(len(res.data['results']),1)
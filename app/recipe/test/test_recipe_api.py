@@ -4,6 +4,8 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from core.models  import Recipe,Tag,Ingredient
+from core.search import uses_search_vector
+from recipe.test.helpers import run_commit_hooks,use_temp_media
 from recipe.serializers import RecipeSerializer,RecipeDetailSerializer
 import tempfile
 import os
@@ -73,7 +75,7 @@ class PrivateRecipeApiTest(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes,many=True)
         self.assertEqual(res.status_code,status.HTTP_200_OK)
-        self.assertEqual(res.data,serializer.data)
+        self.assertEqual(res.data['results'],serializer.data)
 
 
     def test_recipes_limited_to_user(self):
@@ -90,8 +92,8 @@ class PrivateRecipeApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
 
-        self.assertEqual(len(res.data),1)
-        self.assertEqual(res.data,serializer.data)
+        self.assertEqual(len(res.data['results']),1)
+        self.assertEqual(res.data['results'],serializer.data)
 
     def test_view_recipe_details(self):
         """test viewing a recipe detail"""
@@ -104,6 +106,12 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeDetailSerializer(recipe)
         self.assertEqual(res.data,serializer.data)
 
+    def test_non_numeric_detail_pk_not_found(self):
+        """test a pk that is not a number answers 404"""
+        res = self.client.get(detail_url('abc'))
+
+        self.assertEqual(res.status_code,status.HTTP_404_NOT_FOUND)
+
     def test_create_basic_recipe(self):
         """test creating simple recipe"""
         payload = {'title':'chocolate','price':15.00,'time_minutes':5}
@@ -152,6 +160,54 @@ class PrivateRecipeApiTest(TestCase):
         self.assertIn(ingredient1,ingredients)
         self.assertIn(ingredient2,ingredients)
 
+    def test_create_recipe_ids_resolved_in_one_query(self):
+        """test submitted ingredient ids are validated with a single query"""
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'ingredient {i}')
+            for i in range(10)
+        ]
+        payload = {
+        'title':'Soup',
+        'price':'5.00',
+        'time_minutes':10,
+        'ingredients':[ingredient.id for ingredient in ingredients],
+        'tags':[],
+        }
+        # the search index is refreshed once at commit, with one UPDATE on
+        # postgres and five statements elsewhere
+        expected = 12 if uses_search_vector() else 16
+        with self.assertNumQueries(expected) as ctx:
+            res = self.client.post(RECIPE_URL, payload, format='json')
+            run_commit_hooks()
+
+        lookups = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and
+            '"core_ingredient"."user_id" =' in q['sql']
+        ]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(res.status_code,status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.ingredients.count(), 10)
+
+    def test_create_recipe_with_other_users_tags_fails(self):
+        """test ids owned by another user are all reported as missing"""
+        user2 = get_user_model().objects.create_user('kamil@kamil.com','123456789')
+        own_tag = sample_tag(user=self.user)
+        other_tags = [sample_tag(user=user2, name=f'tag {i}') for i in range(2)]
+        payload = {
+        'title':'Soup',
+        'price':'5.00',
+        'time_minutes':10,
+        'tags':[own_tag.id] + [tag.id for tag in other_tags],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code,status.HTTP_400_BAD_REQUEST)
+        for tag in other_tags:
+            self.assertIn(str(tag.id), str(res.data['tags']))
+        self.assertFalse(Recipe.objects.exists())
+
     def test_patial_update_recipe(self):
         """Test updating a recipe partially """
         recipe  = sample_recipe(user= self.user)
@@ -195,10 +251,240 @@ class PrivateRecipeApiTest(TestCase):
         tags = recipe.tags.all()
         self.assertEqual(len(tags),0)
 
+    def test_list_query_count_is_constant(self):
+        """test listing recipes does not issue a query per recipe"""
+        for i in range(5):
+            recipe = sample_recipe(user=self.user, title=f'recipe {i}')
+            recipe.tags.add(sample_tag(user=self.user, name=f'tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'ingredient {i}')
+            )
+
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_detail_query_count_is_constant(self):
+        """test recipe detail loads nested tags and ingredients in bulk"""
+        recipe = sample_recipe(user=self.user)
+        for i in range(5):
+            recipe.tags.add(sample_tag(user=self.user, name=f'tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'ingredient {i}')
+            )
+
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 5)
+        self.assertEqual(len(res.data['ingredients']), 5)
+
+    def test_recipes_paginated_by_cursor(self):
+        """test walking every page returns each recipe exactly once"""
+        recipes = [sample_recipe(user=self.user, title=f'r{i}') for i in range(5)]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(item['id'] for item in res.data['results'])
+
+        self.assertEqual(seen, sorted((r.id for r in recipes), reverse=True))
+
+    def test_list_not_modified(self):
+        """test a matching etag returns 304 without loading recipes"""
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPE_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_changes_on_delete(self):
+        """test deleting a recipe changes the list etag"""
+        recipe = sample_recipe(user=self.user)
+        sample_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+        recipe.delete()
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_detail_not_modified_since(self):
+        """test If-Modified-Since on an unchanged recipe returns 304"""
+        recipe = sample_recipe(user=self.user)
+        res = self.client.get(detail_url(recipe.id))
+        last_modified = res['Last-Modified']
+
+        res = self.client.get(
+            detail_url(recipe.id), HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_when_tag_renamed(self):
+        """test renaming a tag invalidates the recipe detail etag"""
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user)
+        recipe.tags.add(tag)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+        tag.name = 'Dessert'
+        tag.save()
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Dessert')
+
+    def test_search_recipes_ranked(self):
+        """test search matches titles and linked names, title hits first"""
+        by_title = sample_recipe(user=self.user, title='Garlic bread')
+        by_ingredient = sample_recipe(user=self.user, title='Pasta')
+        by_ingredient.ingredients.add(sample_ingredient(user=self.user))
+        sample_recipe(user=self.user, title='Fruit salad')
+
+        run_commit_hooks()
+        res = self.client.get(RECIPE_URL, {'search': 'garlic'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [by_title.id, by_ingredient.id]
+        )
+
+    def test_search_requires_every_term(self):
+        """test a recipe must match all search terms"""
+        recipe = sample_recipe(user=self.user, title='Vegan curry')
+        sample_recipe(user=self.user, title='Chicken curry')
+
+        run_commit_hooks()
+        res = self.client.get(RECIPE_URL, {'search': 'curry vegan'})
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [recipe.id]
+        )
+
+    def test_save_without_title_skips_search_refresh(self):
+        """test saving other columns leaves the search data alone"""
+        recipe = sample_recipe(user=self.user)
+        run_commit_hooks()
+        recipe.image_status = Recipe.IMAGE_PENDING
+
+        with self.assertNumQueries(1):
+            recipe.save(update_fields=['image_status', 'updated_at'])
+            run_commit_hooks()
+
+    def test_search_follows_tag_rename(self):
+        """test renaming a tag updates the search index"""
+        recipe = sample_recipe(user=self.user, title='Soup')
+        tag = sample_tag(user=self.user, name='Winter')
+        recipe.tags.add(tag)
+        tag.name = 'Summer'
+        tag.save()
+
+        run_commit_hooks()
+        res = self.client.get(RECIPE_URL, {'search': 'summer'})
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [recipe.id]
+        )
+
+    def test_filter_any_returns_each_recipe_once(self):
+        """test matching several tags does not duplicate a recipe"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dessert')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+
+    def test_filter_match_all(self):
+        """test match=all only returns recipes linked to every id"""
+        both = sample_recipe(user=self.user, title='both')
+        one = sample_recipe(user=self.user, title='one')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dessert')
+        both.tags.add(tag1, tag2)
+        one.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        )
+
+        self.assertEqual([r['id'] for r in res.data['results']], [both.id])
+
+    def test_filter_invalid_ids(self):
+        """test malformed filter ids are a bad request"""
+        res = self.client.get(RECIPE_URL, {'tags': 'a,b'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_time_and_price_ranges(self):
+        """test range filters keep recipes within both bounds"""
+        quick = sample_recipe(user=self.user, time_minutes=20, price=4.50)
+        sample_recipe(user=self.user, time_minutes=20, price=12.00)
+        sample_recipe(user=self.user, time_minutes=45, price=4.00)
+
+        res = self.client.get(
+            RECIPE_URL, {'time_minutes_max': 30, 'price_max': '5'}
+        )
+
+        self.assertEqual([r['id'] for r in res.data['results']], [quick.id])
+
+    def test_filter_invalid_range(self):
+        """test non numeric bounds are a bad request"""
+        res = self.client.get(RECIPE_URL, {'price_min': 'cheap'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_range_overflow(self):
+        """test bounds the column cannot hold are a bad request"""
+        for params in ({'time_minutes_max': 10 ** 30}, {'price_min': '1e30'}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_ids_overflow(self):
+        """test ids the primary key cannot hold are a bad request"""
+        for name in ('tags', 'ingredients'):
+            res = self.client.get(RECIPE_URL, {name: f'1,{10 ** 20}'})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(name, res.data)
+
+    def test_ordering_pages_by_price(self):
+        """test cursor pages follow ?ordering= including tied prices"""
+        prices = [7, 3, 3, 3, 9, 1]
+        recipes = [sample_recipe(user=self.user, price=p) for p in prices]
+
+        res = self.client.get(RECIPE_URL, {'ordering': 'price', 'page_size': 2})
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(item['id'] for item in res.data['results'])
+
+        expected = sorted(recipes, key=lambda r: (r.price, r.id))
+        self.assertEqual(seen, [r.id for r in expected])
+
+    def test_ordering_by_unknown_field(self):
+        """test ordering on a field that is not whitelisted is rejected"""
+        res = self.client.get(RECIPE_URL, {'ordering': 'user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class RecipeImageUploadTests(TestCase):
 
     def setUp(self):
+        use_temp_media(self)
         self.client = APIClient()
         self.user = get_user_model().objects.create_user('user', 'testpass')
         self.client.force_authenticate(self.user)
@@ -248,9 +534,9 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -270,6 +556,6 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
@@ -0,0 +1,47 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe,Tag
+
+
+STATS_URL = reverse('recipe:stats')
+
+
+class StatsApiTest(TestCase):
+    """test the catalogue stats endpoint"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('stats@stats.com','123456789')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_auth_required(self):
+        """test stats need an authenticated user"""
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stats_from_counters(self):
+        """test stats report recipe totals and the most used tags"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        Tag.objects.create(user=self.user, name='Unused')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'r{i}', time_minutes=5, price=5
+            )
+            recipe.tags.add(vegan)
+            if i == 0:
+                recipe.tags.add(quick)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 3)
+        self.assertEqual(
+            [(t['name'], t['recipe_count']) for t in res.data['tags']],
+            [('Vegan', 3), ('Quick', 1)]
+        )
+        self.assertEqual(res.data['ingredients'], [])
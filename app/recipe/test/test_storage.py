@@ -0,0 +1,76 @@
+import io
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from PIL import Image
+from core.models import Recipe
+from recipe.images import process_recipe_image
+from recipe.renditions import rendition_name
+from recipe.storage import collect_garbage
+from recipe.test.helpers import use_temp_media
+
+
+def jpeg_bytes(color='red'):
+    output = io.BytesIO()
+    Image.new('RGB', (20, 10), color).save(output, format='JPEG')
+    return output.getvalue()
+
+
+class ContentStorageTests(TestCase):
+    """test processed images are stored once per content hash"""
+
+    def setUp(self):
+        use_temp_media(self)
+        self.user = get_user_model().objects.create_user('store@store.com', 'testpass')
+        self.storage = Recipe._meta.get_field('image').storage
+
+    def recipe_with_image(self, data):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=5, price=5
+        )
+        recipe.image.save('upload.jpg', ContentFile(data), save=False)
+        recipe.image_status = Recipe.IMAGE_PENDING
+        recipe.save()
+        process_recipe_image(recipe.id)
+        recipe.refresh_from_db()
+        return recipe
+
+    def test_identical_uploads_share_one_file(self):
+        """test the same photo uploaded twice is stored once, sharded"""
+        first = self.recipe_with_image(jpeg_bytes())
+        second = self.recipe_with_image(jpeg_bytes())
+
+        self.assertEqual(first.image.name, second.image.name)
+        content_hash = first.image_hash
+        self.assertEqual(
+            first.image.name,
+            f'uploads/recipe/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.jpg'
+        )
+
+    def test_collect_keeps_referenced_images(self):
+        """test collection only removes images no recipe refers to"""
+        kept = self.recipe_with_image(jpeg_bytes('red'))
+        shared = self.recipe_with_image(jpeg_bytes('red'))
+        orphan = self.recipe_with_image(jpeg_bytes('blue'))
+        orphan_name = orphan.image.name
+        rendition = rendition_name(orphan.image_hash, 200, 'jpg')
+        shared.delete()
+        orphan.delete()
+
+        collect_garbage(self.storage, grace=timedelta(0))
+
+        self.assertFalse(self.storage.exists(orphan_name))
+        self.assertFalse(self.storage.exists(rendition))
+        self.assertTrue(self.storage.exists(kept.image.name))
+
+    def test_collect_spares_recent_files(self):
+        """test files inside the grace period survive collection"""
+        recipe = self.recipe_with_image(jpeg_bytes())
+        name = recipe.image.name
+        recipe.delete()
+
+        call_command('collect_recipe_images', stdout=io.StringIO())
+
+        self.assertTrue(self.storage.exists(name))
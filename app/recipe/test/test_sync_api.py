@@ -0,0 +1,116 @@
+import io
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe,Tag,Tombstone
+from recipe.views import encode_sync_token
+
+
+SYNC_URL = reverse('recipe:sync')
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'patates', 'time_minutes': 5, 'price': 10.00}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class SyncApiTest(TestCase):
+    """test the delta sync endpoint"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('sync@sync.com','123456789')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_auth_required(self):
+        """test sync needs an authenticated user"""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_full_sync_without_token(self):
+        """test the first sync returns the whole catalogue of the user"""
+        recipe = sample_recipe(self.user)
+        Tag.objects.create(user=self.user, name='Vegan')
+        user2 = get_user_model().objects.create_user('other@sync.com','123456789')
+        sample_recipe(user2)
+
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data['recipes']], [recipe.id])
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertTrue(res.data['token'])
+
+    def test_delta_sync_returns_changes_and_deletions(self):
+        """test a sync with a token only returns what changed after it"""
+        old = sample_recipe(self.user, title='old')
+        deleted = sample_recipe(self.user, title='deleted')
+        Recipe.objects.filter(id__in=[old.id, deleted.id]).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        token = self.client.get(SYNC_URL).data['token']
+        new = sample_recipe(self.user, title='new')
+        deleted_id = deleted.id
+        deleted.delete()
+
+        res = self.client.get(SYNC_URL, {'since': token})
+
+        self.assertEqual([r['id'] for r in res.data['recipes']], [new.id])
+        self.assertEqual(res.data['deleted']['recipes'], [deleted_id])
+
+    def test_invalid_token(self):
+        """test a malformed token is rejected"""
+        res = self.client.get(SYNC_URL, {'since': 'not-a-token'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_SYNC_PAGE_SIZE=2)
+    def test_full_sync_paged(self):
+        """test a large catalogue is returned in pages following next"""
+        ids = [sample_recipe(self.user, title=f'r{i}').id for i in range(5)]
+
+        res = self.client.get(SYNC_URL)
+        seen = [r['id'] for r in res.data['recipes']]
+        token = res.data['token']
+        while res.data['next']:
+            res = self.client.get(SYNC_URL, {'cursor': res.data['next']})
+            seen += [r['id'] for r in res.data['recipes']]
+            self.assertEqual(res.data['token'], token)
+
+        self.assertEqual(seen, ids)
+
+    @override_settings(RECIPE_SYNC_TOMBSTONE_DAYS=1)
+    def test_expired_token_gone(self):
+        """test tokens older than the tombstone retention need a full sync"""
+        token = encode_sync_token(timezone.now() - timedelta(days=2))
+
+        res = self.client.get(SYNC_URL, {'since': token})
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+    def test_prune_tombstones(self):
+        """test old tombstones and those of deleted users are removed"""
+        recent_id = sample_recipe(self.user).id
+        old_id = sample_recipe(self.user).id
+        Recipe.objects.filter(user=self.user).delete()
+        Tombstone.objects.filter(object_id=old_id).update(
+            deleted_at=timezone.now() - timedelta(days=60)
+        )
+        user2 = get_user_model().objects.create_user('gone@sync.com','123456789')
+        sample_recipe(user2)
+        user2.delete()
+
+        self.assertFalse(Tombstone.objects.filter(user_id=user2.id).exists())
+        call_command('prune_tombstones', '--days', '30', stdout=io.StringIO())
+
+        self.assertEqual(
+            list(Tombstone.objects.values_list('object_id', flat=True)),
+            [recent_id]
+        )
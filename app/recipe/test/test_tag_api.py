@@ -44,7 +44,7 @@ class PrivateTagApiTest(TestCase):
 
         serializer = TagSerializer(tags,many=True)
         self.assertEqual(res.status_code,status.HTTP_200_OK)
-        self.assertEqual(res.data,serializer.data)
+        self.assertEqual(res.data['results'],serializer.data)
 
 
     def test_tags_limited_to_user(self):
@@ -59,8 +59,8 @@ class PrivateTagApiTest(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """Test it succesfully create a tag"""
@@ -100,8 +100,8 @@ class PrivateTagApiTest(TestCase):
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
-        self.assertIn(serializer1.data,res.data)
-        self.assertNotIn(serializer2.data,res.data)
+        self.assertIn(serializer1.data,res.data['results'])
+        self.assertNotIn(serializer2.data,res.data['results'])
 
 
     def test_retrieve_tags_assigned_unique(self):
@@ -115,4 +115,48 @@ class PrivateTagApiTest(TestCase):
         recipe2.tags.add(tag1)
 
         res = self.client.get(TAGS_URL,{'assigned_only':1})
-        self.assertEqual(len(res.data),1)
+        self.assertEqual(len(res.data['results']),1)
+
+    def test_tags_paginated_with_duplicate_names(self):
+        """test cursor pages are stable when names repeat"""
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ['Vegan', 'Vegan', 'Vegan', 'Dessert', 'Lunch']]
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(item['id'] for item in res.data['results'])
+
+        self.assertEqual(sorted(seen), sorted(tag.id for tag in tags))
+        names = [Tag.objects.get(id=tag_id).name for tag_id in seen]
+        self.assertEqual(names, sorted(names, reverse=True))
+
+    def test_autocomplete_by_prefix(self):
+        """test prefix lookups return the top matches case insensitively"""
+        for name in ['Vegan', 'vegetarian', 'Veggie', 'Dessert']:
+            Tag.objects.create(user=self.user, name=name)
+        user2 = get_user_model().objects.create_user('other@other.com','testpass')
+        Tag.objects.create(user=user2, name='Venison')
+
+        res = self.client.get(TAGS_URL, {'prefix': 've', 'limit': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in res.data], ['Vegan', 'vegetarian'])
+
+    def test_usage_count(self):
+        """test usage_count reports the number of linked recipes"""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        for title in ['Omelette', 'Pancakes']:
+            recipe = Recipe.objects.create(
+                user=self.user, title=title, price=5.00, time_minutes=15
+            )
+            recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'usage_count': 1})
+
+        counts = {tag['id']: tag['usage_count'] for tag in res.data['results']}
+        self.assertEqual(counts, {tag1.id: 2, tag2.id: 0})
+        res = self.client.get(TAGS_URL)
+        self.assertNotIn('usage_count', res.data['results'][0])
@@ -0,0 +1,189 @@
+import hashlib
+import io
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from PIL import Image
+from core.models import ImageUpload, Recipe
+from recipe.test.helpers import use_temp_media
+from recipe.uploads import UploadClaimed, claim_upload
+
+
+def uploads_url(recipe_id):
+    return reverse('recipe:recipe-start-upload', args=[recipe_id])
+
+
+def chunk_url(recipe_id, upload_id):
+    return reverse('recipe:recipe-upload-chunk', args=[recipe_id, upload_id])
+
+
+def finalize_url(recipe_id, upload_id):
+    return reverse('recipe:recipe-finish-upload', args=[recipe_id, upload_id])
+
+
+def jpeg_bytes():
+    output = io.BytesIO()
+    Image.new('RGB', (64, 64), 'green').save(output, format='JPEG')
+    return output.getvalue()
+
+
+@override_settings(
+    RECIPE_UPLOAD_CHUNK_MAX_BYTES=512,
+    RECIPE_UPLOAD_MAX_SESSIONS=2
+)
+class ChunkedUploadTests(TestCase):
+    """test resumable uploads sent as checksummed byte ranges"""
+
+    def setUp(self):
+        use_temp_media(self)
+        self.user = get_user_model().objects.create_user('chunk@chunk.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=5, price=5
+        )
+        self.data = jpeg_bytes()
+
+    def start(self):
+        res = self.client.post(
+            uploads_url(self.recipe.id),
+            {'filename': 'photo.jpg', 'size': len(self.data)}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']
+
+    def put_chunk(self, upload_id, start, end, checksum=None):
+        chunk = self.data[start:end]
+        return self.client.put(
+            chunk_url(self.recipe.id, upload_id),
+            chunk,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(self.data)}',
+            HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(chunk).hexdigest(),
+        )
+
+    def test_upload_in_chunks(self):
+        """test chunks resume from the reported offset and finalize"""
+        upload_id = self.start()
+        offset = 0
+        while offset < len(self.data):
+            end = min(offset + 500, len(self.data))
+            res = self.put_chunk(upload_id, offset, end)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            offset = res.data['received']
+
+        res = self.client.post(
+            finalize_url(self.recipe.id, upload_id),
+            {'sha256': hashlib.sha256(self.data).hexdigest()}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertFalse(ImageUpload.objects.exists())
+        self.recipe.image.delete()
+
+    def test_chunk_at_wrong_offset_conflicts(self):
+        """test a chunk that skips ahead reports the offset to resume at"""
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, 100)
+
+        res = self.put_chunk(upload_id, 200, 300)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], 100)
+        res = self.client.get(chunk_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data['received'], 100)
+
+    def test_chunk_checksum_mismatch(self):
+        """test a corrupted chunk is rejected and not appended"""
+        upload_id = self.start()
+
+        res = self.put_chunk(upload_id, 0, 100, checksum='0' * 64)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ImageUpload.objects.get(id=upload_id).received, 0)
+
+    def test_open_sessions_capped_per_recipe(self):
+        """test a recipe cannot hold more open uploads than the setting"""
+        self.start()
+        self.start()
+
+        res = self.client.post(
+            uploads_url(self.recipe.id),
+            {'filename': 'photo.jpg', 'size': len(self.data)}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(ImageUpload.objects.count(), 2)
+
+    def test_chunk_over_size_cap(self):
+        """test chunks above the configured cap are refused"""
+        upload_id = self.start()
+
+        res = self.put_chunk(upload_id, 0, 600)
+
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_finalize_incomplete(self):
+        """test finalizing before every byte arrived is a bad request"""
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, 100)
+
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['offset'], 100)
+
+    def test_finalize_twice(self):
+        """test a second finalize of the same session is not found"""
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, 500)
+        self.put_chunk(upload_id, 500, len(self.data))
+        self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_claim_lost_to_concurrent_finalize(self):
+        """test a finalize that loaded the session before another took it conflicts"""
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, 500)
+        self.put_chunk(upload_id, 500, len(self.data))
+        first = ImageUpload.objects.get(id=upload_id)
+        second = ImageUpload.objects.get(id=upload_id)
+
+        claim_upload(first)
+
+        with self.assertRaises(UploadClaimed):
+            claim_upload(second)
+
+    def test_finalize_checksum_mismatch_keeps_session(self):
+        """test a wrong checksum can be retried without uploading again"""
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, 500)
+        self.put_chunk(upload_id, 500, len(self.data))
+
+        res = self.client.post(
+            finalize_url(self.recipe.id, upload_id), {'sha256': '0' * 64}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(
+            finalize_url(self.recipe.id, upload_id),
+            {'sha256': hashlib.sha256(self.data).hexdigest()}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_finalize_rejects_list_body(self):
+        """test a body that is not an object is a bad request"""
+        upload_id = self.start()
+
+        res = self.client.post(
+            finalize_url(self.recipe.id, upload_id), ['x'], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.models import ImageUpload, Recipe
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+READ_SIZE = 64 * 1024
+
+
+class OffsetConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Chunk does not start at the received offset.'
+    default_code = 'offset_conflict'
+
+    def __init__(self, offset):
+        super().__init__()
+        self.offset = offset
+
+
+class UploadIncomplete(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Upload is incomplete.'
+    default_code = 'upload_incomplete'
+
+    def __init__(self, offset):
+        super().__init__()
+        self.offset = offset
+
+
+class UploadClaimed(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Upload is already being finalized.'
+    default_code = 'upload_claimed'
+
+
+class TooManyUploads(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Too many open uploads for this recipe.'
+    default_code = 'too_many_uploads'
+
+
+class ChunkTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Chunk is larger than the allowed size.'
+    default_code = 'chunk_too_large'
+
+
+def upload_dir():
+    path = settings.RECIPE_UPLOAD_TEMP_DIR or os.path.join(
+        tempfile.gettempdir(), 'recipe-uploads'
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def partial_path(upload):
+    return os.path.join(upload_dir(), f'{upload.pk}.partial')
+
+
+def start_upload(recipe, filename, size):
+    """open an upload session with an empty partial file
+
+    at most RECIPE_UPLOAD_MAX_SESSIONS are open per recipe; the recipe row is
+    locked while counting so concurrent starts cannot pass the cap together
+    """
+    with transaction.atomic():
+        Recipe.objects.select_for_update().filter(pk=recipe.pk).exists()
+        open_sessions = ImageUpload.objects.filter(recipe=recipe).count()
+        if open_sessions >= settings.RECIPE_UPLOAD_MAX_SESSIONS:
+            raise TooManyUploads()
+        upload = ImageUpload.objects.create(
+            recipe=recipe, filename=filename, size=size
+        )
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+def parse_content_range(header, size):
+    """return (start, length) of a Content-Range header for this upload"""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise ValidationError({'Content-Range': [
+            'Expected "bytes <start>-<end>/<total>".'
+        ]})
+    start, end, total = (int(value) for value in match.groups())
+    if total != size or end < start or end >= total:
+        raise ValidationError({'Content-Range': ['Range outside the upload.']})
+    return start, end - start + 1
+
+
+def receive_chunk(upload, stream, content_range, checksum):
+    """append one chunk to the partial file and return the new offset
+
+    the body is copied to disk in small reads while it is hashed, so memory
+    does not grow with the chunk size; it is only appended when the digest
+    matches and nobody else appended at this offset meanwhile
+    """
+    start, length = parse_content_range(content_range, upload.size)
+    if length > settings.RECIPE_UPLOAD_CHUNK_MAX_BYTES:
+        raise ChunkTooLarge()
+    if not checksum:
+        raise ValidationError({'X-Chunk-SHA256': ['This header is required.']})
+    if start != upload.received:
+        raise OffsetConflict(upload.received)
+
+    part = os.path.join(upload_dir(), f'{upload.pk}.{uuid.uuid4()}.chunk')
+    digest = hashlib.sha256()
+    try:
+        remaining = length
+        with open(part, 'wb') as target:
+            while remaining:
+                data = stream.read(min(READ_SIZE, remaining)) if stream else b''
+                if not data:
+                    raise ValidationError({'detail': [
+                        'Chunk is shorter than its Content-Range.'
+                    ]})
+                digest.update(data)
+                target.write(data)
+                remaining -= len(data)
+        if digest.hexdigest() != checksum.lower():
+            raise ValidationError({'X-Chunk-SHA256': ['Checksum mismatch.']})
+
+        with transaction.atomic():
+            current = ImageUpload.objects.select_for_update().get(pk=upload.pk)
+            if current.received != start:
+                raise OffsetConflict(current.received)
+            with open(part, 'rb') as source, \
+                    open(partial_path(upload), 'r+b') as target:
+                target.seek(start)
+                shutil.copyfileobj(source, target, READ_SIZE)
+                target.truncate()
+            current.received = start + length
+            current.save(update_fields=['received'])
+        return current.received
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+
+
+def claim_upload(upload):
+    """end a complete session for one finalize request, return its file path
+
+    the session row is locked and deleted in one transaction, so of several
+    concurrent finalize calls exactly one gets the partial file; the caller
+    removes the file when done
+    """
+    path = partial_path(upload)
+    with transaction.atomic():
+        current = ImageUpload.objects.select_for_update().filter(
+            pk=upload.pk
+        ).first()
+        if current is None or not os.path.exists(path):
+            raise UploadClaimed()
+        if current.received != current.size:
+            raise UploadIncomplete(current.received)
+        current.delete()
+    return path
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def discard_upload(upload):
+    if os.path.exists(partial_path(upload)):
+        os.remove(partial_path(upload))
+    upload.delete()
+
+
+def expire_uploads():
+    """drop sessions older than the ttl and partial files without a session"""
+    cutoff = timezone.now() - timedelta(hours=settings.RECIPE_UPLOAD_TTL_HOURS)
+    expired = 0
+    for upload in ImageUpload.objects.filter(created_at__lt=cutoff).iterator():
+        discard_upload(upload)
+        expired += 1
+
+    live = {str(pk) for pk in ImageUpload.objects.values_list('pk', flat=True)}
+    folder = upload_dir()
+    for filename in os.listdir(folder):
+        path = os.path.join(folder, filename)
+        session = filename.split('.', 1)[0]
+        modified = os.path.getmtime(path)
+        if session not in live and modified < cutoff.timestamp():
+            os.remove(path)
+    return expired
@@ -1,4 +1,4 @@
-from django.urls import path,include
+from django.urls import path,include,re_path
 from recipe import views
 from rest_framework.routers import DefaultRouter
 
@@ -14,5 +14,13 @@ router.register('recipes',views.RecipeViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+path('sync/',views.SyncView.as_view(),name='sync'),
+path('stats/',views.StatsView.as_view(),name='stats'),
+path('export/',views.ExportView.as_view(),name='export'),
+re_path(
+    r'^renditions/(?P<content_hash>[0-9a-f]{64})/(?P<width>\d+)\.(?P<ext>\w+)$',
+    views.RenditionView.as_view(),
+    name='rendition'
+),
 path('',include(router.urls))
 ]
@@ -0,0 +1,41 @@
+import warnings
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from PIL import Image
+
+
+def validate_image_header(upload):
+    """check byte size, format and dimensions without decoding any pixels
+
+    Image.open only parses the header, so malformed files and decompression
+    bombs are turned away before anything expensive runs
+    """
+    if upload.size > settings.RECIPE_UPLOAD_MAX_BYTES:
+        raise ValidationError(
+            f'Image is larger than {settings.RECIPE_UPLOAD_MAX_BYTES} bytes.'
+        )
+    upload.seek(0)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            image = Image.open(upload)
+            fmt, (width, height) = image.format, image.size
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ValidationError('Image has too many pixels.')
+    except (OSError, SyntaxError, ValueError):
+        raise ValidationError('Upload a valid image.')
+    finally:
+        upload.seek(0)
+
+    if fmt not in settings.RECIPE_IMAGE_FORMATS:
+        raise ValidationError(
+            'Unsupported image format, expected one of: '
+            + ', '.join(settings.RECIPE_IMAGE_FORMATS) + '.'
+        )
+    if max(width, height) > settings.RECIPE_IMAGE_MAX_SIDE:
+        raise ValidationError(
+            f'Image sides must be at most {settings.RECIPE_IMAGE_MAX_SIDE}px.'
+        )
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise ValidationError('Image has too many pixels.')
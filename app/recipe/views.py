@@ -1,16 +1,51 @@
+import base64
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from django.conf import settings
+from django.db import connection,transaction
+from django.db.backends.base.operations import BaseDatabaseOperations
+from django.db.models import Count,Exists,F,OuterRef,Prefetch
+from django.db.models.functions import Upper
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.http import Http404,HttpResponseRedirect,StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils import timezone
 from rest_framework import mixins,viewsets,status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from recipe import serializers
+from recipe.bulk import BulkModelMixin
+from recipe.cache import CachedResponseMixin
+from recipe.conditional import ConditionalGetMixin
+from recipe.export import CONTENT_TYPES,export_lines
+from recipe.filters import RecipeOrderingFilter
+from recipe.images import UPLOAD_BYTES,process_recipe_image,schedule_image_processing
+from recipe.uploads import OffsetConflict,UploadClaimed,UploadIncomplete,claim_upload,file_sha256,partial_path,receive_chunk,start_upload
+from recipe.validators import validate_image_header
+from recipe.renditions import rendition_formats,rendition_name,rendition_widths,save_rendition
+from recipe.pagination import NameCursorPagination,RecipeCursorPagination,SearchPagination
 from core.models import Tag,Ingredient
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
-from core.models import Recipe
+from user.authentication import CachedTokenAuthentication
+from rest_framework.permissions import AllowAny,IsAuthenticated
+from core.counters import recount
+from core.models import ImageUpload,Recipe,Tombstone,User
+from core.search import search_recipes,update_search_index
+from core.signals import recipe_ids,refresh_recipes
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin,mixins.CreateModelMixin):
+class BaseRecipeAttrViewSet(CachedResponseMixin,BulkModelMixin,viewsets.GenericViewSet, mixins.ListModelMixin,mixins.CreateModelMixin):
     """Base class for tag and ıngredient viewsets """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = NameCursorPagination
+    max_prefix_limit = 50
     queryset = Tag.objects.all()
     def get_queryset(self):
 
@@ -19,12 +54,56 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin,mixin
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = self.queryset.filter(recipe__isnull = False)
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+            queryset = queryset.annotate(
+                assigned=Exists(self._recipe_links())
+            ).filter(assigned=True)
+        if self.request.query_params.get('usage_count'):
+            queryset = queryset.annotate(usage_count=F('recipe_count'))
+        queryset = queryset.filter(user=self.request.user).order_by('-name')
+
+        prefix = self.request.query_params.get('prefix')
+        if prefix:
+            queryset = queryset.filter(
+                name__istartswith=prefix
+            ).order_by(Upper('name'), 'id')[:self._get_prefix_limit()]
+        return queryset
+
+    def _recipe_links(self):
+        """through rows linking the outer tag or ingredient to recipes"""
+        field = Recipe._meta.get_field(self.recipe_relation)
+        return field.remote_field.through.objects.filter(
+            **{field.m2m_reverse_name(): OuterRef('pk')}
+        )
+
+    def _get_prefix_limit(self):
+        """number of autocomplete matches to return"""
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return settings.RECIPE_AUTOCOMPLETE_LIMIT
+        return max(1, min(limit, self.max_prefix_limit))
+
+    @property
+    def paginator(self):
+        """autocomplete returns the top matches without paging"""
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('prefix'):
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
 
     def perform_create(self,serializer):
         """create new tag"""
         serializer.save(user=self.request.user)
+        self.invalidate_cache()
+
+    def perform_bulk_write(self, ids):
+        refresh_recipes(recipe_ids(**{f'{self.recipe_relation}__in': ids}))
+        self.invalidate_cache()
 
 
 
@@ -33,6 +112,7 @@ class TagViewSet(BaseRecipeAttrViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_relation = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
@@ -40,32 +120,160 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_relation = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin,CachedResponseMixin,BulkModelMixin,viewsets.ModelViewSet):
     """manage recipes in the database """
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
+    filter_backends = (RecipeOrderingFilter,)
+    ordering_fields = ('time_minutes', 'price', 'title', 'id')
+    ordering = '-id'
+    range_filters = (('time_minutes', int), ('price', Decimal))
+    image_actions = ('upload_image', 'start_upload', 'upload_chunk', 'finish_upload')
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, qs, name, model):
         """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            ids = list(dict.fromkeys(int(str_id) for str_id in qs.split(',')))
+        except ValueError:
+            raise ValidationError({'detail': ['Expected comma separated ids.']})
+        return [self._check_bounds(name, model._meta.pk, pk) for pk in ids]
+
+    def _filter_related(self, queryset, relation, ids, match):
+        """keep recipes linked to any or all ids without joining rows in"""
+        field = Recipe._meta.get_field(relation)
+        through = field.remote_field.through.objects.filter(**{
+            f'{field.m2m_reverse_name()}__in': ids
+        })
+        if match == 'all':
+            matching = through.order_by().values(field.m2m_column_name()).annotate(
+                hits=Count(field.m2m_reverse_name())
+            ).filter(hits=len(ids)).values(field.m2m_column_name())
+            return queryset.filter(id__in=matching)
+
+        linked = through.filter(**{field.m2m_column_name(): OuterRef('pk')})
+        return queryset.annotate(
+            **{f'has_{relation}': Exists(linked)}
+        ).filter(**{f'has_{relation}': True})
 
+    def _param_to_number(self, name, cast):
+        """parse a numeric query param, None when it is missing"""
+        value = self.request.query_params.get(name)
+        if value is None or value == '':
+            return None
+        try:
+            number = cast(value)
+        except (ValueError, InvalidOperation):
+            number = None
+        if number is None or (cast is Decimal and not number.is_finite()):
+            raise ValidationError({name: ['Expected a number.']})
+        return number
+
+    def _check_bounds(self, name, model_field, number):
+        """refuse numbers the column cannot hold, the backend may overflow"""
+        if isinstance(number, Decimal):
+            limit = Decimal(10) ** (
+                model_field.max_digits - model_field.decimal_places
+            )
+            low, high = -limit, limit
+        else:
+            internal_type = model_field.get_internal_type()
+            # primary keys share the range of the plain integer columns
+            internal_type = {
+                'AutoField': 'IntegerField',
+                'BigAutoField': 'BigIntegerField',
+            }.get(internal_type, internal_type)
+            low, high = connection.ops.integer_field_range(internal_type)
+            if low is None:
+                # sqlite reports no limit but still overflows past 64 bits
+                low, high = BaseDatabaseOperations.integer_field_ranges[
+                    internal_type
+                ]
+        if not low <= number <= high:
+            raise ValidationError({name: ['Number out of range.']})
+        return number
+
+    def _filter_ranges(self, queryset):
+        """apply ?<field>_min= and ?<field>_max= bounds, both inclusive"""
+        for field, cast in self.range_filters:
+            low, high = (
+                self._param_to_number(f'{field}_{bound}', cast)
+                for bound in ('min', 'max')
+            )
+            model_field = Recipe._meta.get_field(field)
+            if low is not None:
+                low = self._check_bounds(f'{field}_min', model_field, low)
+            if high is not None:
+                high = self._check_bounds(f'{field}_max', model_field, high)
+            if low is not None:
+                queryset = queryset.filter(**{f'{field}__gte': low})
+            if high is not None:
+                queryset = queryset.filter(**{f'{field}__lte': high})
+        return queryset
 
     def get_queryset(self):
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': ['Expected "any" or "all".']})
         queryset = self.queryset
         if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            tag_ids = self._params_to_ints(tags, 'tags', Tag)
+            queryset = self._filter_related(queryset, 'tags', tag_ids, match)
         if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            ingredient_ids = self._params_to_ints(
+                ingredients, 'ingredients', Ingredient
+            )
+            queryset = self._filter_related(
+                queryset, 'ingredients', ingredient_ids, match
+            )
+
+        queryset = self._filter_ranges(queryset)
+
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_recipes(queryset, search)
+        return self._apply_query_plan(queryset)
+
+    @property
+    def paginator(self):
+        """ranked search results can not be keyset paginated on id"""
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('search'):
+                self._paginator = SearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
-        return queryset.filter(user=self.request.user)
+    def _apply_query_plan(self, queryset):
+        """load related objects up front based on what the action renders"""
+        if self.action in self.image_actions:
+            return queryset.only(
+                'id', 'user_id', 'image', 'image_status', 'image_hash',
+                'updated_at'
+            )
+
+        queryset = queryset.defer('search_vector')
+        if self.action == 'retrieve':
+            return queryset.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+                Prefetch(
+                    'ingredients',
+                    queryset=Ingredient.objects.only('id', 'name')
+                ),
+            )
+
+        return queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id')),
+            Prefetch('ingredients', queryset=Ingredient.objects.only('id')),
+        )
 
     def get_serializer_class(self):
         """return appropirate serializer class """
@@ -75,12 +283,46 @@ class RecipeViewSet(viewsets.ModelViewSet):
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
 
+        elif self.action in self.image_actions:
+            return serializers.ImageUploadSerializer
+
 
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            self.get_list_validators(request),
+            partial(self.cached_response, super().list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            self.get_detail_validators(request, kwargs['pk']),
+            partial(self.cached_response, super().retrieve, request, *args, **kwargs)
+        )
+
     def perform_create(self,serializer):
         """create a new recipe"""
-        serializer.save(user = self.request.user)
+        # one transaction, so the search data is refreshed once at commit
+        with transaction.atomic():
+            serializer.save(user = self.request.user)
+        self.invalidate_cache()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+        self.invalidate_cache()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        self.invalidate_cache()
+
+    def perform_bulk_write(self, ids):
+        update_search_index(ids)
+        recount(User, [self.request.user.pk])
+        self.invalidate_cache()
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
@@ -91,14 +333,317 @@ class RecipeViewSet(viewsets.ModelViewSet):
             data=request.data
         )
 
-        if serializer.is_valid():
-            serializer.save()
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer.save(image_status=Recipe.IMAGE_PENDING, image_hash='')
+        UPLOAD_BYTES.observe(request.data['image'].size, 'direct')
+        return self._publish_image(recipe)
+
+    def _publish_image(self, recipe):
+        """hand a stored upload to the image pipeline and answer the client"""
+        self.invalidate_cache()
+        context = self.get_serializer_context()
+        if settings.RECIPE_IMAGE_ASYNC:
+            schedule_image_processing(recipe.pk)
             return Response(
-                serializer.data,
-                status=status.HTTP_200_OK
+                serializers.RecipeImageSerializer(recipe, context=context).data,
+                status=status.HTTP_202_ACCEPTED
             )
 
+        if process_recipe_image(recipe.pk) != Recipe.IMAGE_READY:
+            return Response(
+                {'image': ['Upload a valid image.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        recipe.refresh_from_db(fields=['image', 'image_status'])
+        return Response(
+            serializers.RecipeImageSerializer(recipe, context=context).data,
+            status=status.HTTP_200_OK
+        )
+
+    def _get_upload(self, upload_id):
+        recipe = self.get_object()
+        try:
+            upload_id = uuid.UUID(upload_id)
+        except ValueError:
+            raise Http404
+        return recipe, get_object_or_404(ImageUpload, pk=upload_id, recipe=recipe)
+
+    @action(methods=['POST'], detail=True, url_path='uploads')
+    def start_upload(self, request, pk=None):
+        """Open a resumable image upload sent in chunks"""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = start_upload(recipe, **serializer.validated_data)
         return Response(
-            serializer.errors,
-            status=status.HTTP_400_BAD_REQUEST
+            self.get_serializer(upload).data,
+            status=status.HTTP_201_CREATED
         )
+
+    @action(
+        methods=['GET', 'PUT'], detail=True,
+        url_path=r'uploads/(?P<upload_id>[^/.]+)'
+    )
+    def upload_chunk(self, request, pk=None, upload_id=None):
+        """Report the received offset or append the chunk in Content-Range"""
+        _, upload = self._get_upload(upload_id)
+        if request.method == 'PUT':
+            try:
+                upload.received = receive_chunk(
+                    upload,
+                    request.stream,
+                    request.META.get('HTTP_CONTENT_RANGE'),
+                    request.META.get('HTTP_X_CHUNK_SHA256'),
+                )
+            except OffsetConflict as exc:
+                return Response(
+                    {'detail': exc.detail, 'offset': exc.offset},
+                    status=exc.status_code
+                )
+        return Response(self.get_serializer(upload).data)
+
+    @action(
+        methods=['POST'], detail=True,
+        url_path=r'uploads/(?P<upload_id>[^/.]+)/finalize'
+    )
+    def finish_upload(self, request, pk=None, upload_id=None):
+        """Turn a complete upload into the recipe image"""
+        recipe, upload = self._get_upload(upload_id)
+        if not isinstance(request.data, dict):
+            raise ValidationError('Expected an object.')
+        checksum = request.data.get('sha256')
+        if checksum and upload.received == upload.size:
+            # verified before the claim, so a wrong checksum keeps the session
+            try:
+                digest = file_sha256(partial_path(upload))
+            except FileNotFoundError:
+                raise UploadClaimed()
+            if digest != str(checksum).lower():
+                raise ValidationError({'sha256': ['Checksum mismatch.']})
+        try:
+            path = claim_upload(upload)
+        except UploadIncomplete as exc:
+            return Response(
+                {'detail': exc.detail, 'offset': exc.offset},
+                status=exc.status_code
+            )
+        try:
+            with open(path, 'rb') as source:
+                try:
+                    validate_image_header(File(source))
+                except DjangoValidationError as exc:
+                    raise ValidationError({'image': exc.messages})
+                recipe.image.save(upload.filename, File(source), save=False)
+        finally:
+            os.remove(path)
+        recipe.image_status = Recipe.IMAGE_PENDING
+        recipe.image_hash = ''
+        recipe.save(update_fields=[
+            'image', 'image_status', 'image_hash', 'updated_at'
+        ])
+        UPLOAD_BYTES.observe(upload.size, 'chunked')
+        return self._publish_image(recipe)
+
+
+class RenditionView(APIView):
+    """redirect to a stored rendition, generating it on first request
+
+    renditions are addressed by content hash and never change, so they are
+    public like the rest of the media files and cached for good
+    """
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request, content_hash, width, ext):
+        width = int(width)
+        if width not in rendition_widths() or ext not in rendition_formats():
+            raise Http404
+        storage = Recipe._meta.get_field('image').storage
+        name = rendition_name(content_hash, width, ext)
+        if not storage.exists(name):
+            recipe = Recipe.objects.filter(
+                image_hash=content_hash, image_status=Recipe.IMAGE_READY
+            ).only('id', 'image').first()
+            if recipe is None:
+                raise Http404
+            with storage.open(recipe.image.name) as source:
+                save_rendition(storage, content_hash, source.read(), width, ext)
+
+        response = HttpResponseRedirect(storage.url(name))
+        patch_cache_control(
+            response, public=True, max_age=365 * 24 * 3600, immutable=True
+        )
+        return response
+
+
+class ExportView(APIView):
+    """stream the whole catalogue of the user as ndjson or csv"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        # ?format= is taken by drf renderer negotiation
+        fmt = request.query_params.get('type', 'ndjson')
+        if fmt not in CONTENT_TYPES:
+            raise ValidationError({'type': ['Expected "ndjson" or "csv".']})
+        response = StreamingHttpResponse(
+            export_lines(request.user, fmt),
+            content_type=CONTENT_TYPES[fmt]
+        )
+        response['Content-Disposition'] = f'attachment; filename="recipes.{fmt}"'
+        return response
+
+
+class StatsView(APIView):
+    """catalogue counts of the user read from the stored counters"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    top = 10
+
+    def get(self, request):
+        user = request.user
+
+        def most_used(model):
+            return list(model.objects.filter(
+                user=user, recipe_count__gt=0
+            ).order_by('-recipe_count', 'id').values(
+                'id', 'name', 'recipe_count'
+            )[:self.top])
+
+        recipe_count = User.objects.filter(pk=user.pk).values_list(
+            'recipe_count', flat=True
+        ).first()
+        return Response({
+            'recipe_count': recipe_count or 0,
+            'tags': most_used(Tag),
+            'ingredients': most_used(Ingredient),
+        })
+
+
+def _micros(moment):
+    return int(moment.timestamp() * 1000000)
+
+
+def _from_micros(micros):
+    return datetime.fromtimestamp(micros / 1000000, tz=timezone.utc)
+
+
+def encode_sync_token(moment):
+    """turn a datetime into an opaque sync token"""
+    return base64.urlsafe_b64encode(str(_micros(moment)).encode()).decode()
+
+
+def decode_sync_token(token):
+    """turn a sync token back into an aware datetime"""
+    try:
+        micros = int(base64.urlsafe_b64decode(token.encode()).decode())
+        return _from_micros(micros)
+    except (ValueError, TypeError, OverflowError, UnicodeDecodeError):
+        raise ValidationError({'since': ['Invalid sync token.']})
+
+
+def encode_sync_cursor(now, since, after):
+    """opaque cursor to the next page of one sync snapshot"""
+    state = {
+        'at': _micros(now),
+        'since': _micros(since) if since is not None else None,
+        'after': after,
+    }
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def decode_sync_cursor(cursor):
+    """turn a sync cursor back into (now, since, {kind: last id})"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        since = state['since']
+        after = {name: int(pk) for name, pk in state['after'].items()}
+        return (
+            _from_micros(int(state['at'])),
+            _from_micros(int(since)) if since is not None else None,
+            after
+        )
+    except (ValueError, TypeError, KeyError, AttributeError,
+            OverflowError, UnicodeDecodeError):
+        raise ValidationError({'cursor': ['Invalid sync cursor.']})
+
+
+class SyncView(APIView):
+    """return recipes, tags and ingredients changed since a sync token
+
+    every kind is paged by id; clients follow next until it is null and then
+    keep token for the following sync. Tokens older than the tombstone
+    retention get 410 since deletions before it are no longer known.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        user = request.user
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            now, since, after = decode_sync_cursor(cursor)
+        else:
+            now, since, after = timezone.now(), None, {}
+            token = request.query_params.get('since')
+            if token:
+                since = decode_sync_token(token)
+                retention = timedelta(days=settings.RECIPE_SYNC_TOMBSTONE_DAYS)
+                if since < now - retention:
+                    return Response(
+                        {'detail': 'Sync token expired, start a full sync.'},
+                        status=status.HTTP_410_GONE
+                    )
+                # overlap the window so rows committed late with an earlier
+                # timestamp are picked up again; clients upsert by id
+                since -= timedelta(seconds=settings.RECIPE_SYNC_OVERLAP_SECONDS)
+
+        size = settings.RECIPE_SYNC_PAGE_SIZE
+        positions = dict(after)
+        more = False
+
+        def page(name, queryset, moment='updated_at'):
+            nonlocal more
+            queryset = queryset.filter(
+                user=user, id__gt=after.get(name, 0), **{f'{moment}__lte': now}
+            )
+            if since is not None:
+                queryset = queryset.filter(**{f'{moment}__gt': since})
+            rows = list(queryset.order_by('id')[:size + 1])
+            if len(rows) > size:
+                more = True
+                rows = rows[:size]
+            if rows:
+                positions[name] = rows[-1].id
+            return rows
+
+        recipes = page('recipes', Recipe.objects.defer('search_vector').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id')),
+            Prefetch('ingredients', queryset=Ingredient.objects.only('id')),
+        ))
+        tags = page('tags', Tag.objects.all())
+        ingredients = page('ingredients', Ingredient.objects.all())
+        deleted = {'recipes': [], 'tags': [], 'ingredients': []}
+        if since is not None:
+            tombstones = page(
+                'deleted', Tombstone.objects.only('id', 'kind', 'object_id'),
+                moment='deleted_at'
+            )
+            for tombstone in tombstones:
+                deleted[f'{tombstone.kind}s'].append(tombstone.object_id)
+
+        return Response({
+            'token': encode_sync_token(now),
+            'next': encode_sync_cursor(now, since, positions) if more else None,
+            'recipes': serializers.RecipeSerializer(recipes, many=True).data,
+            'tags': serializers.TagSerializer(tags, many=True).data,
+            'ingredients': serializers.IngredientSerializer(
+                ingredients, many=True
+            ).data,
+            'deleted': deleted,
+        })
@@ -0,0 +1,72 @@
+import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core import metrics
+from core.cache import load_cache
+
+TOKEN_CACHE_LOOKUPS = metrics.counter(
+    'auth_token_cache_total', 'Token lookups by cache result.', ('result',)
+)
+
+
+def get_auth_cache():
+    """return the token cache backend or None when caching is off"""
+    return load_cache('auth', getattr(settings, 'AUTH_TOKEN_CACHE', {}))
+
+
+def token_cache_key(key):
+    return f'auth:token:{key}'
+
+
+def forget_token(key):
+    """drop a cached token so the next request hits the database"""
+    backend = get_auth_cache()
+    if backend is not None:
+        backend.delete(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """token authentication that caches the token and user lookup
+
+    hits cost no query; the signals below invalidate the backend, which
+    reaches every worker only with a shared backend, so a per-process cache
+    may serve changes made in another worker for up to TIMEOUT seconds
+    """
+
+    def authenticate_credentials(self, key):
+        backend = get_auth_cache()
+        if backend is None:
+            return super().authenticate_credentials(key)
+
+        cache_key = token_cache_key(key)
+        cached = backend.get(cache_key)
+        if cached is not None:
+            TOKEN_CACHE_LOOKUPS.inc('hit')
+            user, token = cached
+            # requests must not share one mutable user instance
+            return copy.copy(user), token
+
+        TOKEN_CACHE_LOOKUPS.inc('miss')
+        user, token = super().authenticate_credentials(key)
+        backend.set(cache_key, (user, token), settings.AUTH_TOKEN_CACHE.get('TIMEOUT'))
+        return user, token
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    """deactivation, password or profile changes must not be served stale"""
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        forget_token(key)
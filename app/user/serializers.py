@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model,authenticate
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from django.utils.translation import ugettext_lazy as _
+from core.hashers import password_hash_budget
 
 
 
@@ -46,11 +47,12 @@ class AuthTokenSerializer(serializers.Serializer):
         password = attrs.get('password')
 
 
-        user = authenticate(
-            request = self.context.get('request'),
-            username= email,
-            password=password
-        )
+        with password_hash_budget('login'):
+            user = authenticate(
+                request = self.context.get('request'),
+                username= email,
+                password=password
+            )
         if not user:
             msg = _('Could not authenticate with given credentials')
             raise serializers.ValidationError(msg,code='authentication')
@@ -0,0 +1,92 @@
+import time
+from unittest.mock import patch
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from user.authentication import get_auth_cache
+
+
+ME_URL = reverse('user:me')
+
+SHARED_CACHE = {
+    'BACKEND': 'core.cache.SharedCache',
+    'OPTIONS': {},
+    'TIMEOUT': 60,
+}
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """test token lookups are cached and invalidated"""
+
+    def setUp(self):
+        get_auth_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='auth@auth.com', password='testpass', name='name'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_request_skips_token_query(self):
+        """test a shared cache hit authenticates without a query"""
+        with override_settings(AUTH_TOKEN_CACHE=SHARED_CACHE):
+            get_auth_cache().clear()
+            self.client.get(ME_URL)
+
+            with self.assertNumQueries(0):
+                res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_local_hit_skips_token_query(self):
+        """test a per-process cache hit authenticates without a query"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_revocation_by_other_worker_seen_after_timeout(self):
+        """test changes that never reach this cache apply once it expires"""
+        self.client.get(ME_URL)
+        # an update without signals, like a change made in another worker
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        later = time.monotonic() + settings.AUTH_TOKEN_CACHE['TIMEOUT'] + 1
+
+        with patch('core.cache.time.monotonic', return_value=later):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """test a deleted token stops working immediately"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """test deactivating a user invalidates the cached token"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_not_served_stale(self):
+        """test changes saved through the api are seen on the next request"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'new name', 'password': 'newpass'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'new name')
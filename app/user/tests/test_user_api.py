@@ -4,6 +4,7 @@ from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
+from core.models import Recipe
 
 
 CREATE_USER_URL = reverse('user:create')
@@ -150,3 +151,15 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_profile_keeps_recipe_count(self):
+        """test a profile update does not reset the recipe counter"""
+        for i in range(3):
+            Recipe.objects.create(
+                user=self.user, title=f'r{i}', time_minutes=5, price=5
+            )
+
+        self.client.patch(ME_URL, {'name': 'new name'})
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipe_count, 3)